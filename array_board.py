@@ -0,0 +1,273 @@
+from random import randint, sample
+from instrumentation import instrumentation
+from core import (Board, SimpleField, Wall, Boom, Enemy, ShootSprite, EnemyShootSprite, Pepl, EnemyPepl,
+                  StandartSprite, EffectRegistry, EnemyRegistry, FieldDensityError, VECTOR_ANGLES, SHOOT_LENGTH,
+                  EMPTY, WALL, BARREL, TERRAIN_CLASSES)
+
+try:
+    import numpy as np  # нужен только для ArrayBoard
+except ImportError:
+    np = None
+
+# движок импортируется из main после определения Board (см. BOARD_ENGINES), а не сам по себе
+
+
+# альтернативный движок поля на массивах NumPy: вместо списка объектов в каждой клетке
+# хранит рельеф (пусто, коробка, бочка) и занятость клеток врагами в компактных массивах,
+# а врагов и эффекты - в отдельных таблицах, поэтому проверки клеток - это обращения к массивам
+# снаружи ведёт себя как Board, так что игровой цикл работает с ним без изменений
+class ArrayBoard(Board):
+    terrain_classes = TERRAIN_CLASSES
+
+    def __init__(self, *args, **kwargs):
+        if np is None:
+            raise ImportError('ArrayBoard requires numpy')
+        super().__init__(*args, **kwargs)
+
+    # поле в виде списков объектов, как у Board, собирается заново при каждом обращении (для отладки)
+    @property
+    def board(self):
+        return [[self.cell_objects(x, y) for x in range(self.width)] for y in range(self.height)]
+
+    # загрузка поля из списков объектов
+    @board.setter
+    def board(self, cells):
+        self.terrain = np.zeros((self.height, self.width), dtype=np.int8)
+        self.occupancy = np.zeros((self.height, self.width), dtype=np.int32)  # id врага в клетке или 0
+        self.effect_count = np.zeros((self.height, self.width), dtype=np.int16)  # эффектов в клетке
+        self.enemies = EnemyRegistry()  # id врага в occupancy - его id в реестре
+        self.effects = EffectRegistry()
+        for y, row in enumerate(cells):
+            for x, cell in enumerate(row):
+                for obj in cell:
+                    self.put_object(obj, x, y)
+
+    def cell_objects(self, x, y):  # объекты клетки списком, как в Board.board
+        objects = [SimpleField()]
+        if self.terrain[y, x]:
+            objects.append(self.terrain_classes[self.terrain[y, x]]())
+        if self.occupancy[y, x]:
+            objects.append(self.enemies.get(int(self.occupancy[y, x])))
+        objects.extend(self.effects.in_cell(x, y))
+        return objects
+
+    def put_object(self, obj, x, y):  # размещение объекта в клетке
+        if isinstance(obj, Wall):
+            self.terrain[y, x] = WALL
+        elif isinstance(obj, Boom):
+            self.terrain[y, x] = BARREL
+        elif isinstance(obj, Enemy):
+            self.occupancy[y, x] = self.enemies.add(obj)
+        elif isinstance(obj, ShootSprite):
+            self.add_effect(obj, x, y)
+        # SimpleField не храним, пол есть в каждой клетке
+
+    def add_effect(self, effect, x, y):
+        self.effects.add(effect, x, y)
+        self.effect_count[y, x] += 1
+
+    def clear_effects(self, x, y):  # уничтожение всех эффектов клетки
+        if self.effect_count[y, x]:
+            self.effects.remove_cell(x, y)
+            self.effect_count[y, x] = 0
+
+    def enemy_at(self, x, y):  # враг в клетке или None
+        return self.enemies.at(x, y)
+
+    def remove_enemy(self, enemy):  # уничтожение врага
+        if self.enemies.remove(enemy):
+            self.occupancy[enemy.y, enemy.x] = 0
+
+    def destroy_wall(self, x, y):  # уничтожение коробки
+        self.terrain[y, x] = EMPTY
+        self.static_layer = None  # коробка уничтожена, слой статики устарел
+
+    def is_free(self, x, y):
+        return not (self.terrain[y, x] or self.occupancy[y, x] or self.effect_count[y, x])
+
+    def is_blocked(self, x, y):
+        return bool(self.terrain[y, x] or self.occupancy[y, x])
+
+    def clear_field(self):
+        self.board = []
+        self.static_layer = None
+
+    def wall_cells(self):
+        return set(np.flatnonzero(self.terrain).tolist())
+
+    def terrain_bytes(self):
+        return self.terrain.tobytes()
+
+    def load_terrain(self, codes):
+        self.clear_field()
+        self.terrain[:] = np.frombuffer(codes, dtype=np.int8).reshape(self.height, self.width)
+
+    def live_effects(self):
+        return list(self.effects)
+
+    def add_object_to_cell(self, obj, pos=None):
+        if pos is None:
+            pos = randint(0, self.height - 1), randint(0, self.width - 1)
+        if pos == self.player_obj.get_pos():
+            return False
+        if self.is_free(*pos):
+            self.put_object(obj, *pos)
+            return True
+        return False
+
+    @instrumentation.timed
+    def sample_free_cells(self, count):
+        free = (self.terrain == EMPTY) & (self.occupancy == 0) & (self.effect_count == 0)
+        x, y = self.player_obj.get_pos()
+        if 0 <= x < self.width and 0 <= y < self.height:
+            free[y, x] = False
+        free = np.flatnonzero(free)
+        if count > len(free):
+            raise FieldDensityError(f'{count} objects do not fit into {len(free)} free cells')
+        return [divmod(int(index), self.width)[::-1] for index in free[sample(range(len(free)), count)]]
+
+    def enemy_move(self, enemy, vector):
+        x_v, y_v = vector
+        x, y = enemy.get_pos()
+        if not (0 <= x + x_v < self.width and 0 <= y + y_v < self.height):
+            return False  # выход за игровое поле
+        if self.is_blocked(x + x_v, y + y_v):
+            return False  # попытка идти в занятую клетку
+        enemy_id = self.enemies.id_of(enemy)
+        if enemy_id is None or self.occupancy[y, x] != enemy_id:
+            return False  # врага уже нет на поле
+        self.occupancy[y, x] = 0
+        self.occupancy[y + y_v, x + x_v] = enemy_id
+        self.enemies.move(enemy, x + x_v, y + y_v)
+        enemy.angle = VECTOR_ANGLES[tuple(vector)]
+        return True
+
+    @instrumentation.timed
+    def enemy_step(self):
+        destroed = []  # (x, y, враг или None для коробки, угол выстрела) всех подстреленных врагами
+        distances = self.distance_field() if self.enemy_ai == 'flow' else None
+        for enemy in self.enemies:
+            if enemy not in self.enemies:
+                continue  # уничтожен на этом ходу
+            x, y = enemy.get_pos()
+            x_dif = self.player_obj.x - enemy.x
+            y_dif = self.player_obj.y - enemy.y
+            self.aim_at_player(enemy, x_dif, y_dif)
+            # противник стреляет
+            if not enemy.Lose and enemy.triggered:  # если он видит игрока и прошлый раз он не промазал
+                enemy.triggered = False
+                enemy.Lose = True
+                cells, hit = self.cast_ray(x, y, enemy.triggered_vector, player=True)
+                for c_x, c_y in cells:
+                    self.add_effect(EnemyShootSprite((c_y, c_x), enemy.angle, SHOOT_LENGTH), c_x, c_y)
+                if hit is None:
+                    continue
+                h_x, h_y = hit
+                if self.player_obj.get_pos() == hit:
+                    self.game_run = False
+                    self.add_effect(EnemyPepl((h_y, h_x), enemy.angle, 10), h_x, h_y)
+                elif self.terrain[h_y, h_x] == BARREL:
+                    self.explosion(h_x, h_y)
+                elif self.terrain[h_y, h_x] == WALL:
+                    destroed.append((h_x, h_y, None, enemy.angle))
+                elif self.occupancy[h_y, h_x]:
+                    destroed.append((h_x, h_y, self.enemy_at(h_x, h_y), enemy.angle))
+                continue  # если враг выстрелил, то он уже не будет ходить
+            if distances is not None and self.follow_flow(enemy, distances):
+                continue
+            # проверка, может ли враг сократить дистацию с игроком, если не может, то уничтожает препятствие
+            step_x, step_y = x + x_dif // abs(x_dif), y + y_dif // abs(y_dif)
+            if self.is_blocked(x, step_y) and self.is_blocked(step_x, y):
+                # очистка клетки
+                enemy.angle = VECTOR_ANGLES[(0, y_dif // abs(y_dif))]
+                if self.terrain[step_y, x] == BARREL:
+                    self.explosion(x, step_y)
+                elif self.terrain[step_y, x] == WALL:
+                    self.destroy_wall(x, step_y)
+                if self.enemy_at(x, step_y) is not None:
+                    self.remove_enemy(self.enemy_at(x, step_y))
+                self.clear_effects(x, step_y)
+                self.add_effect(EnemyPepl((x, step_y), enemy.angle, 10), x, step_y)
+                continue
+            self.approach_player(enemy, x_dif, y_dif)  # сокращает дистанцию
+        # идем по списку уничтоженных объектов, вставляем в нужные места след лазера
+        # как и в Board, подстреленный враг уничтожается там, где он стоит, даже если успел уйти из клетки,
+        # а след остаётся, только если он ещё в ней; пришедший в клетку после выстрела враг не пострадает
+        for x, y, target, angle in destroed:
+            if target is None:
+                if self.terrain[y, x] != WALL:
+                    continue  # уже уничтожена взрывом
+                self.destroy_wall(x, y)
+            else:
+                if target not in self.enemies:
+                    continue  # уже уничтожен
+                self.remove_enemy(target)
+                if target.get_pos() != (x, y):
+                    continue
+            self.add_effect(EnemyPepl((y, x), angle, 10), x, y)
+
+    # первая занятая клетка ищется по срезу строки или столбца массивов
+    def first_obstacle(self, x, y, vector):
+        x_v, y_v = vector
+        if y_v == 0:
+            line = np.s_[y, x + 1:] if x_v > 0 else np.s_[y, x - 1::-1] if x > 0 else None
+        else:
+            line = np.s_[y + 1:, x] if y_v > 0 else np.s_[y - 1::-1, x] if y > 0 else None
+        if line is None:
+            return None  # стоим у края поля
+        occupied = np.flatnonzero(self.terrain[line] | self.occupancy[line] | self.effect_count[line])
+        if not occupied.size:
+            return None
+        distance = int(occupied[0]) + 1
+        return x + x_v * distance, y + y_v * distance
+
+    @instrumentation.timed
+    def player_shoot(self, vector):
+        x, y = self.player_obj.get_pos()
+        cells, hit = self.cast_ray(x, y, vector)
+        instrumentation.count('player_shoot.cells', len(cells))
+        for c_x, c_y in cells:
+            self.add_effect(ShootSprite((c_y, c_x), self.player_obj.angle, SHOOT_LENGTH), c_x, c_y)
+        if hit is None:
+            return  # если лазер дошёл до края ничего не уничтожив, функция выключается
+        h_x, h_y = hit
+        if self.terrain[h_y, h_x] == BARREL:
+            self.explosion(h_x, h_y)  # если же это бочка, то взрывает
+        elif self.is_blocked(h_x, h_y):  # если это стена или враг, то лазер его уничтожает
+            if self.terrain[h_y, h_x] == WALL:
+                self.destroy_wall(h_x, h_y)
+            else:
+                self.remove_enemy(self.enemy_at(h_x, h_y))
+            self.add_effect(Pepl((h_x, h_y), self.player_obj.angle, 10), h_x, h_y)
+
+    @instrumentation.timed
+    def shoot_render(self):
+        for x, y, creature in self.effects.advance():
+            self.effect_count[y, x] -= 1
+
+    def is_barrel(self, x, y):
+        return self.terrain[y, x] == BARREL
+
+    def destroy_cell(self, x, y):
+        self.terrain[y, x] = EMPTY  # уничтожение бочки или коробки, если они там есть
+        if self.enemy_at(x, y) is not None:
+            self.remove_enemy(self.enemy_at(x, y))
+        self.clear_effects(x, y)
+
+    def draw_static_objects(self, surface):
+        for y in self.visible_rows():
+            for x in self.visible_columns():
+                pos = self.cell_to_screen(x, y)
+                surface.blit(SimpleField.image, pos)
+                if self.terrain[y, x]:
+                    surface.blit(self.terrain_classes[self.terrain[y, x]].image, pos)
+
+    @instrumentation.timed
+    def add_cell_sprites(self):
+        view = np.s_[self.view_y:self.view_y + self.view_height, self.view_x:self.view_x + self.view_width]
+        for enemy_id in self.occupancy[view][self.occupancy[view] != 0]:  # только враги в окне
+            enemy = self.enemies.get(int(enemy_id))
+            self.sprites.add(StandartSprite(enemy.image, self.cell_to_screen(enemy.x, enemy.y), enemy.angle))
+        for x, y, effect in self.effects:
+            if self.is_visible(x, y):
+                self.sprites.add(StandartSprite(effect.image, self.cell_to_screen(x, y), effect.angle))
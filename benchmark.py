@@ -0,0 +1,177 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import subprocess
+from statistics import median
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')  # окно не нужно
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import pygame
+import core
+import main
+
+# █▀▄ █▀▀ █▄ █ ▄▀▀ █ █
+# █▀▄ █▀▀ █ ▀█ █   █▀█
+# ▀▀  ▀▀▀ ▀  ▀  ▀▀ ▀ ▀
+# замеры горячих мест движка на полях разного размера
+# пример: python benchmark.py --out bench.json
+#         python benchmark.py --compare bench.json --threshold 0.2
+
+BOX_DENSITY = 30 / (15 * 15)  # плотность коробок как в обычной игре
+VECTORS = ([0, -1], [0, 1], [-1, 0], [1, 0])
+
+
+# новое поле с заданным числом врагов и плотностью бочек, всегда одинаковое для одного seed
+def make_board(engine, size, enemies, barrels, seed=0, view=None):
+    random.seed(seed)
+    board = main.BOARD_ENGINES[engine](size, size, cell_size=main.cs, left_shift=65, top_shift=75,
+                                       view_size=view and (view, view))
+    board.player_obj.set_pos(size // 2, size // 2)
+    board.generate_field(box_count=int(BOX_DENSITY * size * size), boom_count=int(barrels * size * size),
+                         enemy_count=enemies)
+    return board
+
+
+# поле с выстрелами игрока во все стороны и ответом врагов, чтобы было что анимировать
+def make_board_with_effects(engine, size, enemies, barrels):
+    board = make_board(engine, size, enemies, barrels)
+    for vector in VECTORS:
+        board.player_shoot(vector)
+    board.enemy_step()
+    return board
+
+
+# поле, где в центре стоит квадрат side x side из бочек для цепной реакции
+def make_board_with_barrels(engine, size, side):
+    board = make_board(engine, size, 0, 0)
+    start = (size - side) // 2
+    for y in range(start, start + side):
+        for x in range(start, start + side):
+            if board.is_free(x, y):
+                board.add_object_to_cell(core.Boom(), (x, y))
+    return board, (start, start)
+
+
+# время одного вызова run(state) для каждого из repeat свежих состояний setup(), в микросекундах
+def measure(setup, run, repeat):
+    times = []
+    for _ in range(repeat):
+        state = setup()
+        start = time.perf_counter_ns()
+        run(state)
+        times.append((time.perf_counter_ns() - start) / 1000)
+    return times
+
+
+def cases(engine, size, enemies, barrels, screen, view=None):
+    def empty_board():
+        random.seed(0)
+        return main.BOARD_ENGINES[engine](size, size)
+
+    def board():
+        return make_board(engine, size, enemies, barrels, view=view)
+
+    def effects_board():
+        return make_board_with_effects(engine, size, enemies, barrels)
+
+    def barrel_board():
+        return make_board_with_barrels(engine, size, max(3, size // 4))
+
+    def render(state):
+        state.render(screen)
+
+    def warm_render(state):  # слой статики уже собран, как в обычном кадре
+        state.render(screen)
+        return state
+
+    return {
+        'generate_field': (empty_board,
+                           lambda state: state.generate_field(int(BOX_DENSITY * size * size),
+                                                              int(barrels * size * size), enemies)),
+        'render_cold': (board, render),
+        'render': (lambda: warm_render(board()), render),
+        'shoot_render': (effects_board, lambda state: state.shoot_render()),
+        'enemy_step': (board, lambda state: state.enemy_step()),
+        'player_shoot': (board, lambda state: [state.player_shoot(vector) for vector in VECTORS]),
+        'explosion_chain': (barrel_board, lambda state: state[0].explosion(*state[1])),
+    }
+
+
+def run_benchmarks(engines, sizes, enemy_counts, barrel_densities, repeat, only=None, view=None):
+    screen = main.init_display()
+    results = {}
+    for engine in engines:
+        for size in sizes:
+            for enemies in enemy_counts:
+                for barrels in barrel_densities:
+                    for name, (setup, run) in cases(engine, size, enemies, barrels, screen, view).items():
+                        if only and name not in only:
+                            continue
+                        key = f'{name}/{engine}/{size}x{size}/e{enemies}/b{barrels}'
+                        times = measure(setup, run, repeat)
+                        results[key] = {'median_us': median(times), 'min_us': min(times), 'repeat': repeat}
+                        print(key, results[key], flush=True)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return None
+
+
+# сравнение с прошлым прогоном, возвращает замеры, которые стали медленнее больше чем на threshold
+def compare(results, baseline, threshold):
+    regressions = {}
+    for key, result in results.items():
+        old = baseline.get(key)
+        if not old or 'median_us' not in old or 'median_us' not in result:
+            continue
+        change = result['median_us'] / old['median_us'] - 1
+        if change > threshold:
+            regressions[key] = {'baseline_us': old['median_us'], 'current_us': result['median_us'],
+                                'change': change}
+    return regressions
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Benchmarks of Superhot 2d engine hot paths')
+    parser.add_argument('--engines', nargs='+', default=['list'], choices=sorted(main.BOARD_ENGINES))
+    parser.add_argument('--sizes', type=int, nargs='+', default=[15, 64, 128, 256])
+    parser.add_argument('--enemies', type=int, nargs='+', default=[7, 50])
+    parser.add_argument('--barrels', type=float, nargs='+', default=[0.03, 0.1], help='barrel density')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--only', nargs='+', default=None, help='run only these cases')
+    parser.add_argument('--view', type=int, default=None, help='render only VIEW x VIEW cells around the player')
+    parser.add_argument('--out', default='benchmark.json')
+    parser.add_argument('--compare', default=None, help='previous results to compare with')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed slowdown, 0.2 = 20%%')
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args(sys.argv[1:])
+    results = run_benchmarks(args.engines, args.sizes, args.enemies, args.barrels, args.repeat, args.only, args.view)
+    report = {'meta': {'commit': git_commit(), 'python': platform.python_version(),
+                       'pygame': pygame.version.ver, 'platform': platform.platform()},
+              'results': results}
+    exit_code = 0
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(results, json.load(file)['results'], args.threshold)
+        report['regressions'] = regressions
+        for key, regression in regressions.items():
+            print(f'REGRESSION {key}: {regression["baseline_us"]:.1f} -> {regression["current_us"]:.1f} us '
+                  f'({regression["change"]:+.0%})')
+        exit_code = 1 if regressions else 0
+    with open(args.out, 'w') as file:
+        json.dump(report, file, indent=2)
+    sys.exit(exit_code)
@@ -0,0 +1,102 @@
+import os
+import sys
+import json
+import time
+import argparse
+from statistics import median
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')  # окно нужно только для формата пикселей
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import pygame
+import config
+import core
+import main
+
+# ▄▀▄ ▄▀▀ ▄▀▀ █▀▀ ▀█▀ ▄▀▀
+# █▀█  ▀▄  ▀▄ █▀▀  █   ▀▄
+# ▀ ▀ ▀▀  ▀▀  ▀▀▀  ▀  ▀▀
+# сборка всех изображений игры в один файл с уже декодированными пикселями (см. main.load_bundle)
+# и сравнение времени запуска с набором и без него
+# пример: python build_assets.py --report
+
+
+# пиксели изображения, как их вернул load_image: формат, цвет прозрачности и байты
+# порядок байт как у поверхности, тогда при загрузке convert только копирует пиксели
+def image_pixels(image):
+    pixel_format = 'BGRA' if image.get_masks()[0] == 0xff0000 else 'RGBA'
+    colorkey = image.get_colorkey()
+    return pixel_format, colorkey and list(colorkey[:3]), pygame.image.tobytes(image, pixel_format)
+
+
+def bundle_entries(screen_size):  # (описание, пиксели) всех изображений набора
+    for name, color_key, size, alpha in main.asset_keys(screen_size):
+        yield {'name': name, 'color_key': color_key, 'size': size, 'alpha': alpha, 'frame': None}, \
+            core.load_image(name, color_key, size, alpha)
+    for cls in core.cell_object_classes():
+        if 'sprite' in cls.__dict__ and cls.sheet_grid is not None:
+            sheet = core.load_image(cls.sprite, cls.color_key)
+            for frame, image in enumerate(core.AnimatedSprite(sheet, *cls.sheet_grid).frames):
+                yield {'name': cls.sprite, 'color_key': cls.color_key, 'size': None, 'alpha': None,
+                       'frame': frame}, image
+
+
+# изображения, которые отличаются только прозрачностью (фильтры экрана), ссылаются на одни и те же пиксели:
+# alpha задаётся всей поверхности через set_alpha и применяется из оглавления при загрузке
+def build_bundle(path, screen_size):
+    index = []
+    blobs = []
+    offset = 0
+    stored = {}  # (имя, color_key, размер, кадр) -> (смещение, длина) уже записанных пикселей
+    for entry, image in bundle_entries(screen_size):
+        pixel_format, colorkey, pixels = image_pixels(image)
+        key = entry['name'], str(entry['color_key']), entry['size'], entry['frame']
+        if key not in stored:
+            stored[key] = offset, len(pixels)
+            blobs.append(pixels)
+            offset += len(pixels)
+        entry.update({'image_size': list(image.get_size()), 'format': pixel_format, 'colorkey': colorkey,
+                      'offset': stored[key][0], 'length': stored[key][1],
+                      'mtime': os.path.getmtime(os.path.join(config.sprite_folder_name, entry['name']))})
+        index.append(entry)
+    index_bytes = json.dumps(index).encode()
+    with open(path, 'wb') as file:
+        file.write(main.BUNDLE_HEADER.pack(main.BUNDLE_MAGIC, main.BUNDLE_VERSION, len(index_bytes)))
+        file.write(index_bytes)
+        file.writelines(blobs)
+    return len(index), offset
+
+
+# время загрузки всех изображений игры по отдельным файлам и из набора, в миллисекундах
+def startup_times(path, screen_size, repeat):
+    def load(bundle):
+        core.image_cache.clear()
+        core.sheet_frames.clear()
+        start = time.perf_counter()
+        if bundle:
+            main.load_bundle(path)
+        core.load_assets()
+        for key in main.asset_keys(screen_size):
+            core.load_image(*key)
+        return (time.perf_counter() - start) * 1000
+
+    return {'loose_ms': median(load(False) for _ in range(repeat)),
+            'bundle_ms': median(load(True) for _ in range(repeat))}
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Build the pre-decoded image bundle of Superhot 2d')
+    parser.add_argument('--out', default=config.asset_bundle)
+    parser.add_argument('--report', action='store_true', help='compare startup with and without the bundle')
+    parser.add_argument('--repeat', type=int, default=5)
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args(sys.argv[1:])
+    config.asset_bundle = ''  # собираем из исходных файлов
+    screen = main.init_display()
+    images, pixel_bytes = build_bundle(args.out, screen.get_size())
+    print(f'{args.out}: {images} images, {pixel_bytes / 2 ** 20:.1f} MB of pixels for window {screen.get_size()}')
+    if args.report:
+        print(json.dumps(startup_times(args.out, screen.get_size(), args.repeat), indent=2))
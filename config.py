@@ -8,6 +8,11 @@ move_left = pygame.K_LEFT
 move_right = pygame.K_RIGHT
 move_button = pygame.K_SPACE
 shot_button = pygame.K_e
+save_button = pygame.K_F5
+load_button = pygame.K_F9
+save_file = 'save.dat'
+profiler_button = pygame.K_F3  # оверлей профайлера кадра
+instrumentation_button = pygame.K_F4  # отчёт инструментирования и снятие cProfile
 
 sprite_folder_name = 'pic2'
 player_sprite = 'pers2.png'
@@ -30,6 +35,25 @@ win_sound = 'music/win_sound.mp3'
 glass = 'test.png'
 pixels = 'test3.jpg'
 debug_mode = 1
+board_engine = 'list'  # 'array' - поле на массивах numpy (ArrayBoard)
+enemy_ai = 'greedy'  # 'flow' - враги идут к игроку по кратчайшему пути в обход коробок и бочек
+dirty_rect_rendering = 0  # 1 - обновлять на экране только изменившиеся области
 game_volume = 0.5
+audio = 1  # 0 - без звука, микшер не запускается
+mixer_frequency = 44100  # частота дискретизации микшера
+mixer_buffer = 512  # размер буфера микшера в сэмплах, меньше - меньше задержка звука, больше - реже щелчки
+record_file = ''  # куда записать партию для replay.py, пусто - не записывать
+frame_profiler = 0  # 1 - показывать оверлей профайлера кадра с самого начала
+profiler_csv = ''  # куда писать время фаз каждого кадра, пусто - не писать
+instrumentation = 0  # 1 - считать вызовы и время горячих методов поля (или SUPERHOT_INSTRUMENT=1)
+cprofile_frames = 0  # снимать cProfile столько кадров с начала игры и по F4 (или SUPERHOT_CPROFILE)
+idle_timeout = 500  # сколько мс ждать ввода в простое, прежде чем проверить состояние снова
 
 cell_size = 48  # в пикселях
+board_width = 15  # размер поля в клетках
+board_height = 15
+view_width = 15  # сколько клеток видно в окне, если поле больше, то камера следует за игроком
+view_height = 15
+asset_bundle = 'assets.bundle'  # собирается build_assets.py, без него изображения грузятся по одному
+image_cache_size = 64  # сколько изображений держать в памяти
+loader_workers = 4  # сколько потоков читают изображения и звуки, пока показан стартовый экран
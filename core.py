@@ -0,0 +1,1124 @@
+import pygame
+from random import choice, randint, sample
+import time
+import config
+import os
+import struct
+import hashlib
+from collections import OrderedDict, deque
+from bisect import bisect_left, bisect_right, insort
+from instrumentation import instrumentation
+
+# ядро игры без окна и без выбора движка: клетки, спрайты, реестры и поле Board.
+# array_board.py и main.py импортируют его, а сам он не импортирует ни один движок
+
+all_sprites = pygame.sprite.Group()
+
+# время до исчезновения спрайта стрельбы и пепла
+SHOOT_LENGTH = 10
+# нагрев лазера, при котором он взрывается
+MAX_HEATING = 3
+
+
+# кэш загруженных изображений, чтобы не декодировать png с диска каждый кадр
+# ключ - (имя файла, color_key, размер, прозрачность), при переполнении
+# выкидывается изображение, которое дольше всех не запрашивали (LRU)
+class ImageCache:
+    def __init__(self, max_size=64):
+        self.max_size = max_size
+        self.images = OrderedDict()
+        self.hits = 0  # сколько раз изображение нашлось в кэше
+        self.misses = 0  # сколько раз пришлось грузить с диска
+
+    def get(self, key):
+        image = self.images.get(key)
+        if image is None:
+            self.misses += 1
+            return None
+        self.images.move_to_end(key)  # изображение стало самым "свежим"
+        self.hits += 1
+        return image
+
+    def put(self, key, image):
+        self.images[key] = image
+        self.images.move_to_end(key)
+        while len(self.images) > self.max_size:
+            self.images.popitem(last=False)  # удаление самого старого
+
+    def clear(self):
+        self.images.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.images)
+
+    def __contains__(self, key):  # без учёта в hits и misses
+        return key in self.images
+
+
+image_cache = ImageCache(config.image_cache_size)
+
+
+# опорная функция системы спрайтов, загружает изображение
+# если передать color_key -1, то удалит цвет вернего левого пикселя
+# size - размер, до которого растянуть изображение, alpha - прозрачность всего изображения
+# изображения кэшируются, поэтому возвращённую поверхность изменять нельзя
+def load_image(name, color_key=None, size=None, alpha=None):
+    if color_key is not None and not isinstance(color_key, int):
+        color_key = tuple(color_key)  # pygame.Color не хэшируется
+    key = (name, color_key, None if size is None else tuple(size), alpha)
+    image = image_cache.get(key)
+    if image is not None:
+        return image
+
+    image = prepare_image(decode_image(name, key[2]), color_key, alpha)
+    image_cache.put(key, image)
+    return image
+
+
+# чтение и растягивание изображения, окно для этого не нужно, поэтому можно вызывать из других потоков
+def decode_image(name, size=None):
+    fullname = os.path.join(config.sprite_folder_name, name)
+    try:
+        image = pygame.image.load(fullname)
+    except pygame.error as message:
+        print('Cannot load image:', name)
+        raise SystemExit(message)
+    if size is not None:
+        image = pygame.transform.scale(image, size)
+    return image
+
+
+# конвертация прочитанного изображения в формат окна, только в основном потоке
+def prepare_image(image, color_key=None, alpha=None):
+    image = image.convert()
+    if color_key is not None:
+        if color_key == -1:
+            color_key = image.get_at((0, 0))
+        image.set_colorkey(color_key)
+    else:
+        image = image.convert_alpha()
+    if alpha is not None:
+        image.set_alpha(alpha)
+    return image
+
+
+# стабильные объекты
+# sprite - файл изображения класса, само изображение загружается в load_assets(),
+# чтобы модуль можно было импортировать без окна
+class CellObject:
+    sprite = config.field_sprite
+    color_key = None
+    sheet_grid = None  # (столбцы, строки), если изображение - лист кадров анимации
+    image = None
+
+    def __init__(self, angle=0):
+        self.angle = angle
+
+    def __str__(self):
+        return self.__class__.__name__
+
+
+# обычное поле
+class SimpleField(CellObject):
+    sprite = config.field_sprite
+
+    def __init__(self, angle=0):
+        super().__init__(angle)
+
+
+# объекты, которые могут быть живы или мертвы
+class Creature(CellObject):
+    sprite = config.field_sprite
+
+    def __init__(self, angle=0):
+        super().__init__(angle)
+        self.alive = True
+
+
+class Enemy(Creature):
+    sprite = config.enemy_sprite
+    color_key = -1
+
+    def __init__(self, pos=(0, 0), angle=0, alive=True):
+        super().__init__()
+        self.triggered = False
+        self.angle = angle
+        self.x, self.y = pos
+        self.Lose = False
+        self.alive = alive
+        self.triggered_vector = [0, 0]
+
+    def get_pos(self):
+        return self.x, self.y
+
+    def __repr__(self):
+        return f'Enemy Triggered - {self.triggered},' \
+               f' Triggered vector - {self.triggered_vector},' \
+               f' angle - {self.angle}, x - {self.x}, y - {self.y}, Lose - {self.Lose}'
+
+
+class Player(Creature):
+    sprite = config.player_sprite
+    color_key = -1
+
+    def __init__(self, pos=(0, 0), angle=0, score=0):
+        super().__init__(angle)
+        self.x, self.y = pos
+        self.angle = angle
+        self.score = score
+
+    def get_pos(self):
+        return self.x, self.y
+
+    def set_pos(self, x, y):
+        self.x = x
+        self.y = y
+
+
+class Wall(Creature):
+    sprite = config.wall_sprite
+
+
+class Boom(Creature):
+    sprite = config.boom_sprite
+
+
+# соответсвие направления хода или выстрела, повороту спрайта
+VECTOR_ANGLES = {(0, 1): 180, (0, -1): 0, (1, 0): 270, (-1, 0): 90}
+
+
+# ошибки
+# если попытка пойти в край карты
+class BorderError(Exception):
+    pass
+
+
+# если наступаем на занятую клетку
+class WallStepError(Exception):
+    pass
+
+
+# если на поле не хватает свободных клеток для всех объектов
+class FieldDensityError(Exception):
+    pass
+
+
+# углы, на которые поворачиваются спрайты в игре
+ROTATION_ANGLES = (0, 90, 180, 270)
+
+# кэш повёрнутых изображений, чтобы не вызывать pygame.transform.rotate каждый кадр
+# id поверхности -> (поверхность, {угол: повёрнутая поверхность})
+rotation_cache = {}
+
+
+# возвращает изображение, повёрнутое на angle, поворачивая каждое изображение только один раз
+def rotate_image(image, angle):
+    angle %= 360
+    if angle == 0:
+        return image
+    variants = rotation_cache.get(id(image))
+    if variants is None or variants[0] is not image:  # id мог достаться другой поверхности
+        variants = (image, {})
+        rotation_cache[id(image)] = variants
+    rotated = variants[1].get(angle)
+    if rotated is None:
+        rotated = pygame.transform.rotate(image, angle)
+        variants[1][angle] = rotated
+    return rotated
+
+
+# все классы объектов клетки, родители идут раньше наследников
+def cell_object_classes():
+    classes = [CellObject]
+    for cls in classes:
+        classes.extend(cls.__subclasses__())
+    return classes
+
+
+# заранее строит все четыре поворота для изображений всех объектов клетки и кадров их анимаций
+def prerotate_images():
+    for cls in cell_object_classes():
+        for image in [cls.image] + list(getattr(cls, 'frames', [])):
+            for angle in ROTATION_ANGLES:
+                rotate_image(image, angle)
+
+
+# Спрайт для отрисовки графики, может повернуться на значение angle
+class StandartSprite(pygame.sprite.Sprite):
+    def __init__(self, image, pos, angle):
+        super().__init__()
+        self.image = rotate_image(image, angle)
+        self.rect = self.image.get_rect()
+        self.rect.x = pos[0]
+        self.rect.y = pos[1]
+
+
+# используеться для получения списка кадров
+class AnimatedSprite(pygame.sprite.Sprite):
+    def __init__(self, sheet, columns, rows):
+        super().__init__(all_sprites)
+        self.frames = []
+        self.cut_sheet(sheet, columns, rows)
+
+    def cut_sheet(self, sheet, columns, rows):
+        self.rect = pygame.Rect(0, 0, sheet.get_width() // columns,
+                                sheet.get_height() // rows)
+        for j in range(rows):
+            for i in range(columns):
+                frame_location = (self.rect.w * i, self.rect.h * j)
+                self.frames.append(sheet.subsurface(pygame.Rect(
+                    frame_location, self.rect.size)))
+
+
+class ShootSprite(CellObject):
+    sprite = config.lazer_sprite
+    sheet_grid = (5, 2)
+    frames = []
+
+    def __init__(self, pos, angle=0, timer=0):
+        super().__init__(pos)
+        self.timer = timer
+        self.angle = angle
+
+    def decrease_timer(self):
+        self.timer -= 1
+        if self.frames:  # без загруженных изображений анимацию не переключаем
+            self.image = self.frames[self.timer % len(self.frames)]
+
+
+class EnemyShootSprite(ShootSprite):
+    sprite = config.enemy_lazer_sprite
+
+
+class Pepl(ShootSprite):
+    sprite = config.pepl_sprite
+
+
+class EnemyPepl(ShootSprite):
+    sprite = config.enemy_pepl_sprite
+
+
+class Pepl_Boom(ShootSprite):
+    sprite = config.pepl_boom_sprite
+
+
+sheet_frames = {}  # (имя, color_key) -> кадры анимации из набора изображений (main.load_bundle)
+
+
+# загружает изображения всех объектов клетки, нарезает листы анимаций и поворачивает их
+# требует созданного окна, так как изображения конвертируются в его формат
+def load_assets():
+    for cls in cell_object_classes():
+        if 'sprite' not in cls.__dict__:
+            continue  # наследует изображение родителя
+        if cls.sheet_grid is None:
+            cls.image = load_image(cls.sprite, cls.color_key)
+        else:
+            cls.frames = sheet_frames.get((cls.sprite, cls.color_key)) \
+                         or AnimatedSprite(load_image(cls.sprite, cls.color_key), *cls.sheet_grid).frames
+            cls.image = cls.frames[0]
+    prerotate_images()
+
+
+# объекты, которые не двигаются и рисуются в заранее подготовленный слой
+STATIC_OBJECTS = (SimpleField, Wall, Boom)
+
+
+# интерфейс игрока: счёт и нагрев лазера
+# шрифты открываются один раз, а картинки перерисовываются только когда меняется значение
+class Hud:
+    font_name = 'score_font.ttf'
+    score_color = (74, 130, 203)
+    # размер шрифта и позиция счёта в зависимости от количества цифр,
+    # узкие короткие числа рисуем большим шрифтом
+    # по вертикали позиции отсчитываются от середины поля, нагрев по горизонтали - от правого края окна,
+    # так что при окне 15 на 15 клеток (850 x 850) счёт стоит в (10, 305), а нагрев в (810, 280)
+    score_styles = {1: (133, (10, -130)), 2: (75, (7, -125))}
+    long_score_style = (50, (6, -115))
+    heat_offset = (-40, -155)
+
+    def __init__(self, right=850, middle=435):  # right - ширина окна, middle - середина поля по вертикали
+        self.right = right
+        self.middle = middle
+        self.heat_pos = right + self.heat_offset[0], middle + self.heat_offset[1]
+        self.fonts = {}  # размер -> открытый шрифт
+        self.score = None
+        self.score_image = None
+        self.score_pos = None
+        self.heating = None
+        self.heat_image = None
+
+    def get_font(self, size):
+        if size not in self.fonts:
+            self.fonts[size] = pygame.font.Font(self.font_name, size)
+        return self.fonts[size]
+
+    def set_score(self, score):
+        if score == self.score:
+            return
+        self.score = score
+        size, (x, y) = self.score_styles.get(len(str(score)), self.long_score_style)
+        self.score_pos = x, self.middle + y
+        self.score_image = self.get_font(size).render(str(score), True, self.score_color)
+
+    def set_heating(self, heating):
+        if heating == self.heating:
+            return
+        self.heating = heating
+        self.heat_image = load_image('heat' + str(heating) + '.png')  # выбор цифры, в зависимости от нагрева
+
+
+# реестр живых эффектов (лазеров, пепла и взрывов) вместе с их клетками,
+# каждый кадр продвигаются только они, а не всё поле
+class EffectRegistry:
+    def __init__(self):
+        self.effects = []  # [x, y, эффект] в порядке появления
+
+    def add(self, effect, x, y):
+        self.effects.append((x, y, effect))
+
+    def advance(self):  # уменьшает таймеры и возвращает закончившиеся эффекты
+        alive = []
+        expired = []
+        for entry in self.effects:
+            if entry[2].timer > 0:  # если время еще осталось, то уменьшает его
+                entry[2].decrease_timer()
+                alive.append(entry)
+            else:
+                expired.append(entry)
+        self.effects = alive
+        return expired
+
+    def remove_cell(self, x, y):  # убирает все эффекты клетки
+        self.effects = [entry for entry in self.effects if entry[0] != x or entry[1] != y]
+
+    def in_cell(self, x, y):  # эффекты клетки
+        return [entry[2] for entry in self.effects if entry[0] == x and entry[1] == y]
+
+    def __iter__(self):
+        return iter(self.effects)
+
+    def __len__(self):  # количество живых эффектов
+        return len(self.effects)
+
+
+# живые враги поля: по id в порядке появления, по объекту и по клетке
+# добавление, удаление и поиск врага в клетке за O(1), len - число живых врагов
+class EnemyRegistry:
+    def __init__(self):
+        self.by_id = {}  # id -> враг
+        self.ids = {}  # враг -> id
+        self.cells = {}  # (x, y) -> враг
+        self.next_id = 1  # 0 - нет врага (пустая клетка в ArrayBoard.occupancy)
+
+    def add(self, enemy):  # возвращает id врага
+        if enemy not in self.ids:
+            self.by_id[self.next_id] = enemy
+            self.ids[enemy] = self.next_id
+            self.cells[enemy.get_pos()] = enemy
+            self.next_id += 1
+        return self.ids[enemy]
+
+    def remove(self, enemy):  # возвращает False, если враг уже уничтожен
+        enemy_id = self.ids.pop(enemy, None)
+        if enemy_id is None:
+            return False
+        del self.by_id[enemy_id]
+        if self.cells.get(enemy.get_pos()) is enemy:
+            del self.cells[enemy.get_pos()]
+        return True
+
+    def move(self, enemy, x, y):  # перенос врага в клетку (x, y)
+        if self.cells.get(enemy.get_pos()) is enemy:
+            del self.cells[enemy.get_pos()]
+        enemy.x, enemy.y = x, y
+        self.cells[x, y] = enemy
+
+    def at(self, x, y):  # враг в клетке или None
+        return self.cells.get((x, y))
+
+    def get(self, enemy_id):
+        return self.by_id.get(enemy_id)
+
+    def id_of(self, enemy):
+        return self.ids.get(enemy)
+
+    def __contains__(self, enemy):
+        return enemy in self.ids
+
+    def __iter__(self):  # по копии, чтобы во время обхода можно было уничтожать врагов
+        return iter(list(self.by_id.values()))
+
+    def __len__(self):  # количество живых врагов
+        return len(self.by_id)
+
+
+# индекс занятых клеток: для каждой строки и столбца отсортированные координаты клеток,
+# в которых есть что-то кроме пола, первая занятая клетка по направлению ищется бинарным поиском
+class LineIndex:
+    def __init__(self, width, height):
+        self.rows = [[] for _ in range(height)]  # x занятых клеток строки
+        self.columns = [[] for _ in range(width)]  # y занятых клеток столбца
+        self.cells = set()
+
+    def set(self, x, y, occupied):
+        if occupied == ((x, y) in self.cells):
+            return
+        if occupied:
+            self.cells.add((x, y))
+            insort(self.rows[y], x)
+            insort(self.columns[x], y)
+        else:
+            self.cells.remove((x, y))
+            del self.rows[y][bisect_left(self.rows[y], x)]
+            del self.columns[x][bisect_left(self.columns[x], y)]
+
+    def first(self, x, y, vector):  # первая занятая клетка от (x, y) в направлении vector или None
+        x_v, y_v = vector
+        line, start, step = (self.rows[y], x, x_v) if y_v == 0 else (self.columns[x], y, y_v)
+        if step > 0:
+            i = bisect_right(line, start)
+            if i == len(line):
+                return None
+        else:
+            i = bisect_left(line, start) - 1
+            if i < 0:
+                return None
+        return (line[i], y) if y_v == 0 else (x, line[i])
+
+
+# режимы движения врагов, см. Board.enemy_step
+ENEMY_AIS = ('greedy', 'flow')
+
+# формат сохранения игры (Board.dump_state): заголовок, общее состояние, рельеф по байту на клетку,
+# затем враги и живые эффекты записями фиксированной длины
+SAVE_MAGIC = b'SH2S'
+SAVE_VERSION = 1
+SAVE_HEADER = struct.Struct('<4sBHH')  # magic, версия, ширина, высота
+# игрок (x, y, угол, счёт, жив), нагрев, идёт ли игра, врагов в начале и на прошлом кадре,
+# режим врагов, число врагов и эффектов
+SAVE_GAME = struct.Struct('<2H2i?B?IIBII')
+SAVE_ENEMY = struct.Struct('<2Hh2?2b')  # x, y, угол, Lose, triggered, triggered_vector
+SAVE_EFFECT = struct.Struct('<B2H2h?')  # тип, x, y, угол, таймер, началась ли анимация
+EFFECT_CLASSES = (ShootSprite, EnemyShootSprite, Pepl, EnemyPepl, Pepl_Boom)
+
+
+class Board:
+    def __init__(self, width, height, cell_size=30,
+                 left_shift=10, top_shift=10, view_size=None):
+        self.width = width
+        self.height = height
+        # камера: сколько клеток видно на экране и какая клетка в левом верхнем углу,
+        # по умолчанию видно всё поле
+        self.view_width, self.view_height = view_size or (width, height)
+        self.view_width = min(self.view_width, width)
+        self.view_height = min(self.view_height, height)
+        self.view_x = 0
+        self.view_y = 0
+        self.enemies = EnemyRegistry()
+        self.cell_size = cell_size
+        self.left_shift = left_shift
+        self.top_shift = top_shift
+        self.sprites = pygame.sprite.Group()
+        self.game_run = False
+        self.heating = 0
+        self.enemies_count = 0
+        self.past_enemies_count = 0
+        self.player_obj = Player()
+        self.hud = Hud(2 * left_shift + self.view_width * cell_size, top_shift + self.view_height * cell_size // 2)
+        self.effects = EffectRegistry()  # живые анимации лазеров, пепла и взрывов
+        self.line_index = LineIndex(width, height)  # занятые клетки по строкам и столбцам для лазеров
+        self.walls = set()  # номера (y * width + x) клеток с коробкой или бочкой, для поиска пути врагов
+        # заранее отрисованные фон, пол и неподвижные объекты (коробки и бочки),
+        # None - слой нужно перестроить перед следующим рендером
+        self.static_layer = None
+        # для режима грязных прямоугольников: области экрана, изменившиеся за кадр
+        self.dirty_rects = []
+        self.last_sprite_rects = []  # где были спрайты на прошлом кадре
+        self.last_score_rect = None
+        self.full_redraw = True  # нужно обновить весь экран целиком
+        self.explosion_count = 0  # сколько было цепных реакций, для статистики
+        self.max_explosion_chain = 0  # сколько бочек взорвалось в самой длинной из них
+        self.generation_time = 0  # сколько заняла последняя генерация поля
+        self.enemy_ai = config.enemy_ai
+
+        self.board = [[[] for _ in range(self.width)] for _ in range(self.height)]
+
+    # двигает врага в направлении вектора
+    def enemy_move(self, enemy, vector):
+        x_v, y_v = vector
+        x, y = enemy.get_pos()
+        if not (0 <= x + x_v < self.width and 0 <= y + y_v < self.height):
+            return False  # выход за игровое поле
+        if self.is_blocked(x + x_v, y + y_v):
+            return False  # попытка идти в занятую клетку
+        # если все нормально
+        if enemy in self.board[y][x]:  # попытка перенести объект врага в игровом поле
+            self.board[y][x].remove(enemy)
+            self.board[y + y_v][x + x_v].append(enemy)
+            self.cell_changed(x, y)
+            self.cell_changed(x + x_v, y + y_v)
+            self.enemies.move(enemy, x + x_v, y + y_v)
+            enemy.angle = VECTOR_ANGLES[tuple(vector)]
+            return True
+        else:
+            return False
+
+    # ход врагов, обработка передвижения и стрельбы
+    # враг решает, стрелять ли ему в игрока, и поворачивается в сторону выстрела
+    def aim_at_player(self, enemy, x_dif, y_dif):
+        # если враг на одной линии с игроком, то он безусловно стреляет
+        if x_dif == 0 or y_dif == 0:
+            enemy.Lose = False
+            enemy.triggered = True
+            enemy.triggered_vector = [0, 1] if x_dif == 0 and y_dif > 0 else [0, -1] \
+                if x_dif == 0 and y_dif < 0 else [1, 0] if y_dif == 0 and x_dif > 0 else [-1, 0]
+            enemy.angle = VECTOR_ANGLES[tuple(enemy.triggered_vector)]
+        # если разница с игроком в 1 клетку, враг пытается убить игрока, но только если он так уже не пытался
+        if abs(x_dif) <= 1 and enemy.triggered == False and enemy.Lose == False:
+            enemy.triggered_vector = [0, y_dif // abs(y_dif)]
+            enemy.triggered = True
+            enemy.angle = VECTOR_ANGLES[tuple(enemy.triggered_vector)]
+        # если разница с игроком в 1 клетку, враг пытается убить игрока, но только если он так уже не пытался
+        if abs(y_dif) <= 1 and enemy.triggered == False and enemy.Lose == False:
+            enemy.triggered = True
+            enemy.triggered_vector = [x_dif // abs(x_dif), 0]
+            enemy.angle = VECTOR_ANGLES[tuple(enemy.triggered_vector)]
+
+    # враг сокращает дистанцию с игроком
+    def approach_player(self, enemy, x_dif, y_dif):
+        if randint(0, 1) == 1:
+            if self.enemy_move(enemy, [x_dif // abs(x_dif), 0]):
+                return
+        if self.enemy_move(enemy, [0, y_dif // abs(y_dif)]):
+            return
+        else:
+            self.enemy_move(enemy, [x_dif // abs(x_dif), 0])
+        # если враг сходил, то может выстрелить
+        enemy.Lose = False
+
+    # расстояния в шагах от игрока до клеток поля в обход коробок и бочек, построчно, -1 - клетка недостижима
+    # один поиск в ширину на ход всех врагов, останавливается, как только дошёл до каждого из них
+    @instrumentation.timed
+    def distance_field(self):
+        walls = self.wall_cells()
+        width = self.width
+        distances = [-1] * (width * self.height)
+        start = self.player_obj.y * width + self.player_obj.x
+        distances[start] = 0
+        targets = {enemy.y * width + enemy.x for enemy in self.enemies}
+        targets.discard(start)
+        queue = deque([start])
+        while queue and targets:
+            cell = queue.popleft()
+            x = cell % width
+            for near in (cell - width, cell + width, cell - 1 if x > 0 else -1, cell + 1 if x < width - 1 else -1):
+                if 0 <= near < len(distances) and distances[near] < 0 and near not in walls:
+                    distances[near] = distances[cell] + 1
+                    targets.discard(near)
+                    queue.append(near)
+        return distances
+
+    def wall_cells(self):  # номера (y * width + x) клеток с коробкой или бочкой
+        return self.walls
+
+    # враг идёт в соседнюю свободную клетку, которая на шаг ближе к игроку по карте расстояний
+    # возвращает False, если такой клетки нет (игрок недостижим или путь загородили другие враги)
+    def follow_flow(self, enemy, distances):
+        x, y = enemy.get_pos()
+        distance = distances[y * self.width + x]
+        if distance <= 0:
+            return False
+        vectors = [vector for vector in ((1, 0), (-1, 0), (0, 1), (0, -1))
+                   if 0 <= x + vector[0] < self.width and 0 <= y + vector[1] < self.height
+                   and distances[(y + vector[1]) * self.width + x + vector[0]] == distance - 1]
+        vectors = [vector for vector in vectors if not self.is_blocked(x + vector[0], y + vector[1])]
+        if not vectors or not self.enemy_move(enemy, choice(vectors)):
+            return False
+        enemy.Lose = False  # если враг сходил, то может выстрелить
+        return True
+
+    @instrumentation.timed
+    def enemy_step(self):
+        destroed = []  # список всех уничтоженных врагами объектов, в порядке выстрелов
+        # в режиме 'flow' враги идут к игроку по общей карте расстояний
+        distances = self.distance_field() if self.enemy_ai == 'flow' else None
+        for enemy in self.enemies:
+            if enemy not in self.enemies:
+                continue  # уничтожен на этом ходу
+            x, y = enemy.get_pos()
+            x_dif = self.player_obj.x - enemy.x
+            y_dif = self.player_obj.y - enemy.y
+            self.aim_at_player(enemy, x_dif, y_dif)
+            # противник стреляет
+            if not enemy.Lose and enemy.triggered:  # если он видит игрока и прошлый раз он не промазал
+                enemy.triggered = False
+                enemy.Lose = True
+                # задается направление стрельбы, лазер летит до первой занятой клетки или игрока
+                cells, hit = self.cast_ray(x, y, enemy.triggered_vector, player=True)
+                for c_x, c_y in cells:
+                    self.add_effect(EnemyShootSprite((c_y, c_x), enemy.angle, SHOOT_LENGTH), c_x, c_y)
+                if hit is None:
+                    continue  # лазер улетел за край поля
+                h_x, h_y = hit
+                # игрок не хранится в обычной сетке поля, поэтому отдельно проверяем его позицию
+                if self.player_obj.get_pos() == hit:
+                    self.game_run = False
+                    self.add_effect(EnemyPepl((h_y, h_x), enemy.angle, 10), h_x, h_y)
+                    continue
+                instrumentation.count('enemy_step.isinstance', len(self.board[h_y][h_x]))
+                for i in self.board[h_y][h_x]:  # проверяем столкновение
+                    if isinstance(i, Wall) or isinstance(i, Enemy):
+                        destroed.append((h_y, h_x, i, enemy.angle))
+                    elif isinstance(i, Boom):
+                        self.explosion(h_x, h_y)
+                continue  # если враг выстрелил, то он уже не будет ходить
+            if distances is not None and self.follow_flow(enemy, distances):
+                continue
+            # проверка, может ли враг сократить дистацию с игроком, если не может, то уничтожает препятствие
+            instrumentation.count('enemy_step.isinstance', len(self.board[y + y_dif // abs(y_dif)][x])
+                                  + len(self.board[y][x + x_dif // abs(x_dif)]))
+            if len([x for x in self.board[y + y_dif // abs(y_dif)][x]
+                    if not (isinstance(x, (Pepl, ShootSprite, EnemyPepl, EnemyShootSprite)))]) > 1 \
+                    and len([x for x in self.board[y][x + x_dif // abs(x_dif)] if not
+            (isinstance(x, (Pepl, ShootSprite, EnemyPepl, EnemyShootSprite)))]) > 1:
+                # очистка клетки
+                enemy.angle = VECTOR_ANGLES[(0, y_dif // abs(y_dif))]
+                step_y = y + y_dif // abs(y_dif)
+                if self.is_barrel(x, step_y):
+                    self.explosion(x, step_y)
+                elif any(isinstance(i, Wall) for i in self.board[step_y][x]):
+                    self.static_layer = None  # коробка уничтожена, слой статики устарел
+                self.destroy_cell(x, step_y)  # вместе с эффектами, которые оставил взрыв
+                self.add_effect(EnemyPepl((x, step_y), enemy.angle, 10), x, step_y)
+                continue
+            self.approach_player(enemy, x_dif, y_dif)  # сокращает дистанцию
+        # идем по списку уничтоженных объектов, вставляем в нужные места след лазера
+        for elem in destroed:
+            if isinstance(elem[2], Enemy):
+                enemy = elem[2]
+                # подстреленный враг мог успеть уйти из клетки, тогда убираем его оттуда, где он стоит,
+                # иначе он остался бы на поле, но пропал из реестра врагов
+                if self.enemies.remove(enemy) and enemy in self.board[enemy.y][enemy.x] \
+                        and (enemy.y, enemy.x) != elem[:2]:
+                    self.board[enemy.y][enemy.x].remove(enemy)
+                    self.cell_changed(enemy.x, enemy.y)
+            if elem[2] in self.board[elem[0]][elem[1]]:
+                if isinstance(elem[2], STATIC_OBJECTS):
+                    self.static_layer = None  # коробка уничтожена, слой статики устарел
+                    self.walls.discard(elem[0] * self.width + elem[1])
+                self.board[elem[0]][elem[1]].remove(elem[2])
+                self.add_effect(EnemyPepl((elem[0], elem[1]), elem[3], 10), elem[1], elem[0])
+
+    # первая занятая клетка (в ней есть что-то кроме пола) от (x, y) в направлении vector или None
+    def first_obstacle(self, x, y, vector):
+        return self.line_index.first(x, y, vector)
+
+    # луч лазера из (x, y) в направлении vector, возвращает свободные клетки, которые он прошёл,
+    # и клетку, в которую попал (None, если долетел до края поля)
+    # если player, то лазер может попасть и в игрока, он не хранится в сетке поля
+    @instrumentation.timed
+    def cast_ray(self, x, y, vector, player=False):
+        x_v, y_v = vector
+        hit = self.first_obstacle(x, y, vector)
+        if player:
+            p_x, p_y = self.player_obj.get_pos()
+            distance = (p_x - x) * x_v + (p_y - y) * y_v  # расстояние до игрока вдоль луча
+            on_line = p_x == x if x_v == 0 else p_y == y
+            if on_line and distance > 0 and (hit is None or distance <= abs(hit[0] - x) + abs(hit[1] - y)):
+                hit = p_x, p_y
+        if hit is None:  # лазер летит до края поля
+            length = (self.width - 1 - x if x_v > 0 else x if x_v < 0 else
+                      self.height - 1 - y if y_v > 0 else y)
+        else:
+            length = abs(hit[0] - x) + abs(hit[1] - y) - 1
+        return [(x + x_v * k, y + y_v * k) for k in range(1, length + 1)], hit
+
+    # Функция, отслеживающая время отрисовки лазеров
+    @instrumentation.timed
+    def player_shoot(self, vector):  # функция стрельбы игрока
+        x, y = self.player_obj.get_pos()  # получает информацию о игроке
+        cells, hit = self.cast_ray(x, y, vector)  # идет в сторону направления игрока до первого препятствия
+        instrumentation.count('player_shoot.cells', len(cells))
+        for c_x, c_y in cells:  # и добавляет эффект лазера в пройденные клетки
+            self.add_effect(ShootSprite((c_y, c_x), self.player_obj.angle, SHOOT_LENGTH), c_x, c_y)
+        if hit is None:
+            return  # если лазер дошёл до края ничего не уничтожив, функция выключается
+        h_x, h_y = hit
+        for i in self.board[h_y][h_x]:  # в клетке, куда попал лазер
+            if isinstance(i, Wall) or isinstance(i, Enemy):  # если это стена или враг
+                self.board[h_y][h_x].remove(i)  # то лазер его уничтожает
+                if isinstance(i, Enemy):  # и также убирает врага из списка врагов
+                    self.enemies.remove(i)
+                else:
+                    self.static_layer = None  # коробка уничтожена, слой статики устарел
+                    self.walls.discard(h_y * self.width + h_x)
+                self.add_effect(Pepl((h_x, h_y), self.player_obj.angle, 10), h_x, h_y)  # и добавляет эффект взрыва
+            elif isinstance(i, Boom):
+                self.explosion(h_x, h_y)  # если же это бочка, то взрывает
+
+    def add_effect(self, effect, x, y):  # добавление анимации лазера, пепла или взрыва в клетку
+        self.board[y][x].append(effect)
+        self.effects.add(effect, x, y)
+        self.cell_changed(x, y)
+
+    def cell_changed(self, x, y):  # обновление индекса занятых клеток после изменения клетки
+        self.line_index.set(x, y, not self.is_free(x, y))
+
+    @instrumentation.timed
+    def shoot_render(self):  # функция уничтожения лазеров и взрывов, вреям анимации которых кончилось
+        for x, y, creature in self.effects.advance():  # продвигает только живые эффекты
+            if creature in self.board[y][x]:  # эффект мог уже уничтожить взрыв
+                self.board[y][x].remove(creature)
+                self.cell_changed(x, y)
+
+    def has_active_effects(self):  # есть ли на поле ещё не закончившиеся анимации лазеров и взрывов
+        return len(self.effects) > 0
+
+    @instrumentation.timed
+    def explosion(self, x, y):  # взрыв бочки вместе со всей цепной реакцией, возвращает число взорвавшихся бочек
+        self.static_layer = None  # бочка и коробки рядом уничтожаются, слой статики устарел
+        cells, chain = self.explosion_area(x, y)
+        instrumentation.count('explosion.cells', len(cells))
+        for c_x, c_y in cells:  # сначала находим все задетые клетки, потом один раз их уничтожаем
+            self.destroy_cell(c_x, c_y)
+            self.add_effect(Pepl_Boom((c_x, c_y), 0, 10), c_x, c_y)  # создание эффекта взрыва
+            if self.player_obj.get_pos() == (c_x, c_y):  # если бочка взорвала игрока, игра заканчивается
+                self.player_obj.alive = False
+                self.game_run = False
+        self.explosion_count += 1
+        self.max_explosion_chain = max(self.max_explosion_chain, chain)
+        return chain
+
+    # обход цепной реакции очередью: каждая бочка взрывается один раз и задевает область 3 на 3 вокруг себя,
+    # возвращает задетые клетки в порядке обхода и число взорвавшихся бочек
+    def explosion_area(self, x, y):
+        cells = {}  # словарь как упорядоченное множество
+        barrels = {(x, y)}
+        queue = deque([(x, y)])
+        while queue:
+            b_x, b_y = queue.popleft()
+            for c_y in range(max(b_y - 1, 0), min(b_y + 2, self.height)):
+                for c_x in range(max(b_x - 1, 0), min(b_x + 2, self.width)):  # проходит по области возле бочки
+                    cells[c_x, c_y] = True
+                    if (c_x, c_y) not in barrels and self.is_barrel(c_x, c_y):  # цепочка взрывов
+                        barrels.add((c_x, c_y))
+                        queue.append((c_x, c_y))
+        return cells, len(barrels)
+
+    def is_barrel(self, x, y):
+        return any(isinstance(creature, Boom) for creature in self.board[y][x])
+
+    def destroy_cell(self, x, y):  # уничтожение всего в клетке, кроме пола
+        effects = False
+        for creature in self.board[y][x]:
+            if isinstance(creature, Enemy):
+                self.enemies.remove(creature)
+            elif isinstance(creature, ShootSprite):
+                effects = True
+        if effects:  # эффекты клетки убираем и из реестра, чтобы он не считал их живыми
+            self.effects.remove_cell(x, y)
+        self.board[y][x] = [creature for creature in self.board[y][x] if isinstance(creature, SimpleField)]
+        self.walls.discard(y * self.width + x)
+        self.cell_changed(x, y)
+
+    @instrumentation.timed
+    def build_static_layer(self, size):  # отрисовка фона, пола, коробок и бочек в одну поверхность
+        self.full_redraw = True  # поменялся фон - меняется весь экран
+        self.static_layer = pygame.Surface(size).convert()
+        self.static_layer.fill('black')
+        self.static_layer.blit(load_image(config.background_sprite), (0, 0))
+        self.draw_static_objects(self.static_layer)
+
+    def draw_static_objects(self, surface):  # отрисовка пола, коробок и бочек
+        for i in self.visible_rows():
+            for j in self.visible_columns():
+                for creature in self.board[i][j]:
+                    if isinstance(creature, STATIC_OBJECTS):
+                        surface.blit(rotate_image(creature.image, creature.angle), self.cell_to_screen(j, i))
+
+    @instrumentation.timed
+    def add_cell_sprites(self):  # добавление спрайтов врагов и эффектов, стоящих на поле
+        for i in self.visible_rows():
+            for j in self.visible_columns():  # проходит по видимой части board
+                for creature in self.board[i][j]:  # и добавляет соотвестсвующий спрайт
+                    if isinstance(creature, STATIC_OBJECTS):
+                        continue  # уже нарисован в слое статики
+                    self.sprites.add(StandartSprite(creature.image, self.cell_to_screen(j, i), creature.angle))
+
+    def update_camera(self):  # камера следует за игроком, не выходя за край поля
+        view_x = min(max(self.player_obj.x - self.view_width // 2, 0), self.width - self.view_width)
+        view_y = min(max(self.player_obj.y - self.view_height // 2, 0), self.height - self.view_height)
+        if (view_x, view_y) != (self.view_x, self.view_y):
+            self.view_x, self.view_y = view_x, view_y
+            self.static_layer = None  # на экране другая часть поля
+
+    def visible_rows(self):  # строки поля, попадающие в окно
+        return range(self.view_y, self.view_y + self.view_height)
+
+    def visible_columns(self):  # столбцы поля, попадающие в окно
+        return range(self.view_x, self.view_x + self.view_width)
+
+    def is_visible(self, x, y):
+        return self.view_x <= x < self.view_x + self.view_width and self.view_y <= y < self.view_y + self.view_height
+
+    def cell_to_screen(self, x, y):  # координаты левого верхнего угла клетки на экране с учётом камеры
+        return ((x - self.view_x) * self.cell_size + self.left_shift,
+                (y - self.view_y) * self.cell_size + self.top_shift)
+
+    @instrumentation.timed
+    def render(self, screen):  # функция рендера изображения
+        self.update_camera()
+        if self.static_layer is None or self.static_layer.get_size() != screen.get_size():
+            self.build_static_layer(screen.get_size())
+        screen.blit(self.static_layer, (0, 0))  # фон и неподвижные объекты одним блитом
+        self.sprites.empty()  # очистка списка спрайтов
+        self.add_cell_sprites()
+        self.sprites.add(StandartSprite(self.player_obj.image,  # отдельная обработка игрока, он не хранится в board
+                                        self.cell_to_screen(*self.player_obj.get_pos()), self.player_obj.angle))
+        self.sprites.update()  # обновление списка спрайтов
+        instrumentation.count('render.sprites', len(self.sprites))
+        self.sprites.draw(screen)  # отрисовка
+        # изменились места, где спрайты были на прошлом кадре и где они сейчас
+        sprite_rects = [sprite.rect for sprite in self.sprites]
+        self.dirty_rects.extend(self.last_sprite_rects)
+        self.dirty_rects.extend(sprite_rects)
+        self.last_sprite_rects = sprite_rects
+
+    def pop_dirty_rects(self):  # возвращает изменившиеся области экрана, None - обновить весь экран
+        rects = None if self.full_redraw else self.dirty_rects
+        self.dirty_rects = []
+        self.full_redraw = False
+        return rects
+
+    def add_full_screen(self, screen, path, group, alpha=250):  # функция добавления фона
+        image = load_image(path, size=screen.get_size(), alpha=alpha)  # создание нужного изобрадения фона
+        group.add(StandartSprite(image, (0, 0), 0))
+        # self.sprites.draw(screen)  # отрисовка
+
+    def render_heating(self, screen):  # функция отрисовки нагрева
+        self.hud.set_heating(self.heating)
+        self.dirty_rects.append(screen.blit(self.hud.heat_image, self.hud.heat_pos))  # отрисовка
+
+    def render_player_score(self, screen):  # функция отрисовки счёта игрока
+        self.hud.set_score(self.player_obj.score)
+        rect = screen.blit(self.hud.score_image, self.hud.score_pos)  # отрисовка
+        self.dirty_rects.append(rect)
+        if self.last_score_rect is not None:  # старый счёт мог быть шире нового
+            self.dirty_rects.append(self.last_score_rect)
+        self.last_score_rect = rect
+
+    def get_cell(self, pos):  # функция для получения координаты клетки по координатам нажатия мышки
+        x_index = (pos[0] - self.left_shift) // self.cell_size
+        y_index = (pos[1] - self.top_shift) // self.cell_size
+
+        if 0 <= x_index < self.view_width and 0 <= y_index < self.view_height:  # если нажали на поле
+            return x_index + self.view_x, y_index + self.view_y
+        return None
+
+    def add_object_to_cell(self, obj, pos=None):
+        # метод для генерации поля, проверяет пустая ли клетка позиции
+        # если да, то добавляет объект и возвращает True, иначе - возвращает False
+        # если pos не передали генерирует сама
+        if pos is None:
+            pos = randint(0, self.height - 1), randint(0, self.width - 1)
+        if pos == self.player_obj.get_pos():
+            return False
+        if self.is_free(*pos):
+            self.board[pos[1]][pos[0]].append(obj)
+            if isinstance(obj, (Wall, Boom)):
+                self.walls.add(pos[1] * self.width + pos[0])
+            self.cell_changed(*pos)
+            return True
+        return False
+
+    def is_free(self, x, y):  # в клетке нет ничего, кроме пола
+        return len(self.board[y][x]) == 1
+
+    def is_blocked(self, x, y):  # стоит ли в клетке коробка, бочка или враг
+        for cell_obj in self.board[y][x]:
+            if isinstance(cell_obj, (Wall, Boom, Enemy)):
+                return True
+        return False
+
+    def clear_field(self):  # пустое поле из одних стандартных клеток
+        self.board = [[[SimpleField()] for _ in range(self.width)] for _ in range(self.height)]
+        self.effects = EffectRegistry()
+        self.line_index = LineIndex(self.width, self.height)
+        self.walls = set()
+        self.enemies = EnemyRegistry()
+        self.static_layer = None  # новое поле - новый слой статики
+
+    @instrumentation.timed
+    def generate_field(self, box_count=30, boom_count=7, enemy_count=7):  # функция генерации поля
+        start = time.perf_counter()
+        count = box_count + boom_count + enemy_count
+        if count >= self.width * self.height:  # одна клетка всегда остаётся игроку
+            raise FieldDensityError(f'{count} objects do not fit into {self.width}x{self.height} field')
+        self.clear_field()
+        # клетки для всех объектов выбираются сразу из свободных без повторов, поэтому генерация
+        # не зацикливается на занятых клетках и всегда завершается
+        cells = self.sample_free_cells(count)
+        instrumentation.count('generate_field.objects', count)
+        for pos in cells[:box_count]:
+            self.add_object_to_cell(Wall(), pos)  # создание коробок сколько требуется
+        for pos in cells[box_count:box_count + boom_count]:
+            self.add_object_to_cell(Boom(), pos)  # создание бочек сколько требуется
+        for pos in cells[box_count + boom_count:]:  # создание врагов сколько требуется
+            new_enemy = Enemy(pos, choice([0, 90, 180, 270]))  # задание угла и координат врагу
+            self.add_object_to_cell(new_enemy, pos)
+            self.enemies.add(new_enemy)  # добавление в список врагов
+        self.generation_time = time.perf_counter() - start  # в секундах, для замеров
+
+    @instrumentation.timed
+    def sample_free_cells(self, count):  # count случайных различных свободных клеток, кроме клетки игрока
+        free = [(x, y) for y in range(self.height) for x in range(self.width)
+                if self.is_free(x, y) and (x, y) != self.player_obj.get_pos()]
+        if count > len(free):
+            raise FieldDensityError(f'{count} objects do not fit into {len(free)} free cells')
+        return sample(free, count)
+
+    def check_actions(self):  # функция проверки
+        x, y = self.player_obj.x, self.player_obj.y
+        if self.is_blocked(x, y):  # не находится ли игрок внутри чегото, если находитя, то игра заканчивается
+            self.player_obj.alive = False
+            self.game_run = False
+
+    def check_enemy_lives(self):  # функция для проверки
+        if not len(self.enemies):  # возвращает число живых врагов
+            self.game_run = False
+        return len(self.enemies)
+
+    def move_player(self, vector):  # функция перемещения игрока
+        x_v, y_v = vector
+        x, y = self.player_obj.get_pos()
+        if not (0 <= x + x_v < self.width and 0 <= y + y_v < self.height):
+            raise BorderError  # если он не вышел за границы карты
+        if self.is_blocked(x + x_v, y + y_v):  # и не идёт в препятствие
+            raise WallStepError
+        self.player_obj.set_pos(x + x_v, y + y_v)  # то двигается
+        return True
+
+    def new_game(self, screen=None, restart=True):  # фунуция для создание новго уровня
+        self.enemies = EnemyRegistry()  # обновление списка врагов
+
+        self.player_obj.set_pos(randint(0, self.width - 1), randint(0, self.height - 1))
+        self.player_obj.angle = 0  # создание игрока
+        if restart:
+            self.player_obj.score = 0  # если игрок умер, а не перешёл на следующий уровень
+        self.heating = 0
+        self.game_run = True  # обновление переменных
+
+        # на больших картах объектов больше, плотность как на поле 15 на 15
+        density = self.width * self.height / (15 * 15)
+        self.enemies_count = round(7 * density)
+        self.past_enemies_count = self.enemies_count
+        self.generate_field(round(30 * density), round(7 * density), self.enemies_count)  # создание поля
+        self.full_redraw = True
+        if screen is not None:  # без окна только генерируем уровень
+            self.render(screen)
+            self.render_heating(screen)  # отрисовка
+
+    def update_player_score(self):  # функция для обновления счёта игрока
+        alive = self.check_enemy_lives()
+        self.player_obj.score += self.past_enemies_count - alive  # прошлый счёт + убитые с прошлого раза
+        self.past_enemies_count = alive
+
+    # хеш всего, что влияет на игру: рельеф, игрок, враги и живые эффекты, одинаковый для обоих движков
+    def state_hash(self):
+        state = hashlib.blake2b(digest_size=16)
+        state.update(self.terrain_bytes())
+        player = self.player_obj
+        effects = sorted((x, y, EFFECT_CLASSES.index(type(effect)), effect.angle, effect.timer)
+                         for x, y, effect in self.live_effects())  # порядок в реестрах движков может отличаться
+        state.update(struct.pack('<6i3?', player.x, player.y, player.angle, player.score, self.heating,
+                                 len(effects), player.alive, self.game_run, self.enemy_ai == 'flow'))
+        for enemy in self.enemies:
+            state.update(struct.pack('<3i2?', enemy.x, enemy.y, enemy.angle, enemy.Lose, enemy.triggered))
+        for effect in effects:
+            state.update(struct.pack('<2iB2i', *effect))
+        return state.digest()
+
+    def dump_state(self):  # всё состояние игры в компактном двоичном виде, загружается restore_state
+        player = self.player_obj
+        effects = self.live_effects()
+        return b''.join([
+            SAVE_HEADER.pack(SAVE_MAGIC, SAVE_VERSION, self.width, self.height),
+            SAVE_GAME.pack(player.x, player.y, player.angle, player.score, player.alive, self.heating,
+                           self.game_run, self.enemies_count, self.past_enemies_count,
+                           ENEMY_AIS.index(self.enemy_ai), len(self.enemies), len(effects)),
+            self.terrain_bytes(),
+            b''.join(SAVE_ENEMY.pack(enemy.x, enemy.y, enemy.angle, enemy.Lose, enemy.triggered,
+                                     *enemy.triggered_vector) for enemy in self.enemies),
+            b''.join(SAVE_EFFECT.pack(EFFECT_CLASSES.index(type(effect)), x, y, effect.angle, effect.timer,
+                                      'image' in vars(effect)) for x, y, effect in effects),
+        ])
+
+    def restore_state(self, data):  # загрузка игры из dump_state, размер поля берётся из сохранения
+        magic, version, width, height = SAVE_HEADER.unpack_from(data)
+        if magic != SAVE_MAGIC or version != SAVE_VERSION:
+            raise ValueError(f'not a version {SAVE_VERSION} save')
+        offset = SAVE_HEADER.size
+        (x, y, angle, score, alive, self.heating, self.game_run, self.enemies_count, self.past_enemies_count,
+         enemy_ai, enemy_count, effect_count) = SAVE_GAME.unpack_from(data, offset)
+        offset += SAVE_GAME.size
+        self.width, self.height = width, height
+        self.view_width, self.view_height = min(self.view_width, width), min(self.view_height, height)
+        self.enemy_ai = ENEMY_AIS[enemy_ai]
+        self.player_obj = Player((x, y), angle, score)
+        self.player_obj.alive = alive
+        self.load_terrain(data[offset:offset + width * height])  # очищает поле
+        offset += width * height
+        data = memoryview(data)
+        for e_x, e_y, angle, lose, triggered, v_x, v_y in SAVE_ENEMY.iter_unpack(
+                data[offset:offset + enemy_count * SAVE_ENEMY.size]):
+            enemy = Enemy((e_x, e_y), angle)
+            enemy.Lose, enemy.triggered, enemy.triggered_vector = lose, triggered, [v_x, v_y]
+            self.put_object(enemy, e_x, e_y)
+        offset += enemy_count * SAVE_ENEMY.size
+        for kind, e_x, e_y, angle, timer, animated in SAVE_EFFECT.iter_unpack(
+                data[offset:offset + effect_count * SAVE_EFFECT.size]):
+            effect = EFFECT_CLASSES[kind]((e_y, e_x), angle, timer)
+            if animated and effect.frames:  # кадр анимации зависит от таймера
+                effect.image = effect.frames[timer % len(effect.frames)]
+            self.add_effect(effect, e_x, e_y)
+
+    def terrain_bytes(self):  # рельеф построчно по байту на клетку: EMPTY, WALL или BARREL
+        codes = bytearray(self.width * self.height)
+        for y, row in enumerate(self.board):
+            for x, cell in enumerate(row):
+                for creature in cell:
+                    if isinstance(creature, Wall):
+                        codes[y * self.width + x] = WALL
+                    elif isinstance(creature, Boom):
+                        codes[y * self.width + x] = BARREL
+        return bytes(codes)
+
+    def load_terrain(self, codes):  # пустое поле с рельефом из terrain_bytes
+        self.clear_field()
+        for i, code in enumerate(codes):
+            if code:
+                self.put_object(TERRAIN_CLASSES[code](), i % self.width, i // self.width)
+
+    def put_object(self, obj, x, y):  # размещение объекта в клетке без проверок
+        if isinstance(obj, ShootSprite):
+            self.add_effect(obj, x, y)
+            return
+        self.board[y][x].append(obj)
+        if isinstance(obj, Enemy):
+            self.enemies.add(obj)
+        elif isinstance(obj, (Wall, Boom)):
+            self.walls.add(y * self.width + x)
+        self.cell_changed(x, y)
+
+    def live_effects(self):  # эффекты, которые ещё стоят на поле (взрыв мог убрать их из клетки раньше)
+        return [(x, y, effect) for x, y, effect in self.effects if effect in self.board[y][x]]
+
+
+# содержимое клетки в рельефе ArrayBoard и в сохранениях
+EMPTY = 0
+WALL = 1
+BARREL = 2
+TERRAIN_CLASSES = {WALL: Wall, BARREL: Boom}
@@ -0,0 +1,75 @@
+import os
+import time
+import atexit
+import cProfile
+import pstats
+import functools
+import config
+
+
+# инструментирование горячих мест: число вызовов и суммарное время методов поля под декоратором timed
+# и свои счётчики count, отчёт при выходе или по нажатию клавиши; включается переменной окружения
+# SUPERHOT_INSTRUMENT=1 или config.instrumentation, выключенное не оборачивает методы
+# отдельно можно снять cProfile за несколько кадров (SUPERHOT_CPROFILE=число кадров или config.cprofile_frames)
+class Instrumentation:
+    def __init__(self, enabled=False, profile_frames=0):
+        self.enabled = enabled
+        self.calls = {}  # имя метода -> [вызовов, время в наносекундах]
+        self.counters = {}  # имя счётчика -> значение
+        self.profile_frames = profile_frames  # на сколько кадров включается cProfile
+        self.profile = None
+        self.frames_left = 0
+        if enabled:
+            atexit.register(self.print_report)
+
+    def timed(self, function):  # декоратор для замера вызовов метода
+        if not self.enabled:
+            return function
+        stats = self.calls.setdefault(function.__qualname__, [0, 0])
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                stats[0] += 1
+                stats[1] += time.perf_counter_ns() - start
+        return wrapper
+
+    def count(self, name, value=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def report(self):
+        lines = [f'{"method":<32}{"calls":>10}{"total ms":>12}{"per call us":>14}']
+        for name, (calls, spent) in sorted(self.calls.items(), key=lambda item: -item[1][1]):
+            if calls:
+                lines.append(f'{name:<32}{calls:>10}{spent / 1e6:>12.2f}{spent / calls / 1e3:>14.2f}')
+        lines.append(f'{"counter":<32}{"value":>10}')
+        for name, value in sorted(self.counters.items()):
+            lines.append(f'{name:<32}{value:>10}')
+        return '\n'.join(lines)
+
+    def print_report(self):
+        if self.enabled and (self.counters or any(calls for calls, _ in self.calls.values())):
+            print(self.report())
+
+    def start_profile(self):  # cProfile на следующие profile_frames кадров
+        if self.profile_frames and self.profile is None:
+            self.profile = cProfile.Profile()
+            self.frames_left = self.profile_frames
+            self.profile.enable()
+
+    def frame_done(self):
+        if self.profile is None:
+            return
+        self.frames_left -= 1
+        if self.frames_left <= 0:
+            self.profile.disable()
+            pstats.Stats(self.profile).sort_stats('cumulative').print_stats(25)
+            self.profile = None
+
+
+instrumentation = Instrumentation(os.environ.get('SUPERHOT_INSTRUMENT') == '1' or bool(config.instrumentation),
+                                  int(os.environ.get('SUPERHOT_CPROFILE', config.cprofile_frames)))
@@ -1,573 +1,471 @@
 import pygame
-from random import choice, randint
+import random
 import time
 import config
 import os
+import struct
+import json
+import mmap
+from collections import deque
+from concurrent import futures
+from concurrent.futures import ThreadPoolExecutor
+from instrumentation import instrumentation
+from profiler import FrameProfiler
+from recording import Recording
+from core import (Board, StandartSprite, BorderError, WallStepError, VECTOR_ANGLES, MAX_HEATING,
+                  image_cache, load_image, decode_image, prepare_image, cell_object_classes, sheet_frames,
+                  load_assets)
+from array_board import ArrayBoard
+
 
 # ▄▀▀ █ █ █▀▄ █▀▀ █▀▀▄   █   ▄▀▄ ▀█▀    ▄▀▄  █▀▄
 #  ▀▄ █ █ █ █ █▀▀ █▐█▀   █▀▄ █ █  █      ▄▀  █ █
 # ▀▀   ▀  █▀  ▀▀▀ ▀ ▀▀   ▀ ▀  ▀   ▀     █▄▄  ▀▀
 
 
-all_sprites = pygame.sprite.Group()
-
-# время до исчезновения спрайта стрельбы и пепла
-SHOOT_LENGTH = 10
+# на сколько кадров замораживается управление после хода игрока
+TURN_FREEZE = 20
+# при каком значении заморозки ходят враги (после анимации игрока)
+ENEMY_STEP_FREEZE = 9
 
-pygame.init()
-n1 = 15  # клеток по горизонтали
-n2 = 15  # клеток по вертикали
+n1 = config.board_width  # клеток по горизонтали
+n2 = config.board_height  # клеток по вертикали
+view_size = min(n1, config.view_width), min(n2, config.view_height)  # сколько клеток видно в окне
 cs = 48  # длинна одной стороны клетки
-size = 130 + n1 * cs, 130 + n2 * cs  # размеры экрана
-screen = pygame.display.set_mode(size)
-pygame.display.set_caption('Superhot 2d')
-
-
-# опорная функция системы спрайтов, загружает изображение
-# если передать color_key -1, то удалит цвет вернего левого пикселя
-def load_image(name, color_key=None):
-    fullname = os.path.join(config.sprite_folder_name, name)
-    try:
-        image = pygame.image.load(fullname).convert()
-    except pygame.error as message:
-        print('Cannot load image:', name)
-        raise SystemExit(message)
-
-    if color_key is not None:
-        if color_key == -1:
-            color_key = image.get_at((0, 0))
-        image.set_colorkey(color_key)
+size = 130 + view_size[0] * cs, 130 + view_size[1] * cs  # размеры экрана
+screen = None  # окно создаётся в init_display(), без него можно запускать логику игры
+
+
+# все изображения, которые нужны игре при окне размера screen_size, в виде аргументов load_image
+def asset_keys(screen_size):
+    keys = [(cls.sprite, cls.color_key, None, None) for cls in cell_object_classes()
+            if 'sprite' in cls.__dict__ and cls.sheet_grid is None]
+    keys.append((config.background_sprite, None, None, None))
+    keys.extend(('heat' + str(heating) + '.png', None, None, None) for heating in range(MAX_HEATING + 1))
+    for name in (config.start_screen, config.game_over_sprite, config.game_win_screen):
+        keys.append((name, None, screen_size, None))
+    keys.extend((name, None, screen_size, alpha) for name, alpha in FILTER_LAYERS)
+    keys.extend((name, None, screen_size, None) for name, _ in FILTER_LAYERS)  # для экранов конца игры
+    return keys
+
+
+# заранее собранный набор изображений (build_assets.py): пиксели уже декодированы, растянуты под размер окна,
+# листы анимаций нарезаны на кадры; в файле заголовок, оглавление в json и сырые пиксели подряд
+BUNDLE_MAGIC = b'SH2A'
+BUNDLE_VERSION = 1
+BUNDLE_HEADER = struct.Struct('<4sBI')  # magic, версия, длина оглавления
+
+
+# открывает набор через mmap, возвращает (данные, оглавление) или None, если набора нет или он другой версии
+# изображения, исходники которых изменились после сборки, в оглавление не попадают и грузятся как обычно
+def open_bundle(path):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, 'rb') as file:
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, index_size = BUNDLE_HEADER.unpack_from(data)
+    if magic != BUNDLE_MAGIC or version != BUNDLE_VERSION:
+        data.close()
+        return None
+    start = BUNDLE_HEADER.size + index_size
+    entries = []
+    for entry in json.loads(data[BUNDLE_HEADER.size:start]):
+        source = os.path.join(config.sprite_folder_name, entry['name'])
+        if os.path.exists(source) and os.path.getmtime(source) == entry['mtime']:
+            entry['offset'] += start
+            entry['color_key'] = tuple(entry['color_key']) if isinstance(entry['color_key'], list) \
+                else entry['color_key']
+            entry['size'] = None if entry['size'] is None else tuple(entry['size'])
+            entries.append(entry)
+    return data, entries
+
+
+def bundle_key(entry):  # аргументы load_image, под которыми изображение набора лежит в кэше
+    return entry['name'], entry['color_key'], entry['size'], entry['alpha']
+
+
+# конвертирует одно изображение набора в формат окна и кладёт его в кэш load_image,
+# кадры анимаций собираются в frames: (имя, color_key) -> {номер кадра: изображение}
+def load_bundle_entry(data, entry, frames):
+    pixels = data[entry['offset']:entry['offset'] + entry['length']]
+    image = pygame.image.frombuffer(pixels, entry['image_size'], entry['format'])
+    if entry['colorkey'] is not None:  # изображение с цветом прозрачности
+        image = image.convert()
+        image.set_colorkey(entry['colorkey'])
     else:
         image = image.convert_alpha()
-    return image
-
-
-# стабильные объекты
-class CellObject:
-    image = load_image(config.field_sprite)
-
-    def __init__(self, angle=0):
-        self.angle = angle
-
-    def __str__(self):
-        return self.__class__.__name__
-
-
-# обычное поле
-class SimpleField(CellObject):
-    image = load_image(config.field_sprite)
-
-    def __init__(self, angle=0):
-        super().__init__(angle)
-
-
-# объекты, которые могут быть живы или мертвы
-class Creature(CellObject):
-    image = load_image(config.field_sprite)
-
-    def __init__(self, angle=0):
-        super().__init__(angle)
-        self.alive = True
-
-
-class Enemy(Creature):
-    image = load_image(config.enemy_sprite, -1)
-
-    def __init__(self, pos=(0, 0), angle=0, alive=True):
-        super().__init__()
-        self.triggered = False
-        self.angle = angle
-        self.x, self.y = pos
-        self.Lose = False
-        self.alive = alive
-        self.triggered_vector = [0, 0]
-
-    def get_pos(self):
-        return self.x, self.y
-
-    def __repr__(self):
-        return f'Enemy Triggered - {self.triggered},' \
-               f' Triggered vector - {self.triggered_vector},' \
-               f' angle - {self.angle}, x - {self.x}, y - {self.y}, Lose - {self.Lose}'
-
-
-class Player(Creature):
-    image = load_image(config.player_sprite, -1)
-
-    def __init__(self, pos=(0, 0), angle=0, score=0):
-        super().__init__(angle)
-        self.x, self.y = pos
-        self.angle = angle
-        self.score = score
-
-    def get_pos(self):
-        return self.x, self.y
-
-    def set_pos(self, x, y):
-        self.x = x
-        self.y = y
-
-
-class Wall(Creature):
-    image = load_image(config.wall_sprite)
-
-
-class Boom(Creature):
-    image = load_image(config.boom_sprite)
-
-
-# ошибки
-# если попытка пойти в край карты
-class BorderError(Exception):
-    pass
-
-
-# если наступаем на занятую клетку
-class WallStepError(Exception):
-    pass
-
-
-# Спрайт для отрисовки графики, может повернуться на значение angle
-class StandartSprite(pygame.sprite.Sprite):
-    def __init__(self, image, pos, angle):
-        super().__init__()
-        self.image = image
-        if angle != 0:
-            self.image = pygame.transform.rotate(self.image, angle)
-        self.rect = self.image.get_rect()
-        self.rect.x = pos[0]
-        self.rect.y = pos[1]
-
-
-# используеться для получения списка кадров
-class AnimatedSprite(pygame.sprite.Sprite):
-    def __init__(self, sheet, columns, rows):
-        super().__init__(all_sprites)
-        self.frames = []
-        self.cut_sheet(sheet, columns, rows)
-
-    def cut_sheet(self, sheet, columns, rows):
-        self.rect = pygame.Rect(0, 0, sheet.get_width() // columns,
-                                sheet.get_height() // rows)
-        for j in range(rows):
-            for i in range(columns):
-                frame_location = (self.rect.w * i, self.rect.h * j)
-                self.frames.append(sheet.subsurface(pygame.Rect(
-                    frame_location, self.rect.size)))
-
-
-class ShootSprite(CellObject):
-    frames = AnimatedSprite(load_image(config.lazer_sprite), 5, 2).frames
-    image = frames[0]
-
-    def __init__(self, pos, angle=0, timer=0):
-        super().__init__(pos)
-        self.timer = timer
-        self.angle = angle
-
-    def decrease_timer(self):
-        self.timer -= 1
-        self.image = self.frames[self.timer % len(self.frames)]
-
-
-class EnemyShootSprite(ShootSprite):
-    frames = AnimatedSprite(load_image(config.enemy_lazer_sprite), 5, 2).frames
-    image = frames[0]
-
-
-class Pepl(ShootSprite):
-    frames = AnimatedSprite(load_image(config.pepl_sprite), 5, 2).frames
-    image = frames[0]
-
-
-class EnemyPepl(ShootSprite):
-    frames = AnimatedSprite(load_image(config.enemy_pepl_sprite), 5, 2).frames
-    image = frames[0]
-
-
-class Pepl_Boom(ShootSprite):
-    frames = AnimatedSprite(load_image(config.pepl_boom_sprite), 5, 2).frames
-    image = frames[0]
-
-
-class Board:
-    def __init__(self, width, height, cell_size=30,
-                 left_shift=10, top_shift=10):
-        self.width = width
-        self.height = height
-        self.enemies = []
-        self.cell_size = cell_size
-        self.left_shift = left_shift
-        self.top_shift = top_shift
-        self.sprites = pygame.sprite.Group()
-        self.game_run = False
-        self.heating = 0
-        self.enemies_count = 0
-        self.past_enemies_count = 0
-        self.player_obj = Player()
-
-        self.board = [[[] for _ in range(self.width)] for _ in range(self.height)]
-
-    # двигает врага в направлении вектора
-    def enemy_move(self, enemy, vector):
-        angles = {(0, 1): 180, (0, -1): 0, (1, 0): 270, (-1, 0): 90}
-        # соответсвие направления хода, повороту спрайта врага
-        x_v, y_v = vector
-        x, y = enemy.get_pos()
-        if not (0 <= x + x_v < self.width and 0 <= y + y_v < self.height):
-            return False  # выход за игровое поле
-        for cell_obj in self.board[y + y_v][x + x_v]:
-            if isinstance(cell_obj, Wall) or isinstance(cell_obj, Boom) or isinstance(cell_obj, Enemy):
-                return False  # попытка идти в занятую клетку
-        # если все нормально
-        if enemy in self.board[y][x]:  # попытка перенести объект врага в игровом поле
-            self.board[y][x].remove(enemy)
-            self.board[y + y_v][x + x_v].append(enemy)
-            enemy.x, enemy.y = x + x_v, y + y_v
-            enemy.angle = angles[tuple(vector)]
-            return True
-        else:
-            return False
-
-    # ход врагов, обработка передвижения и стрельбы
-    def enemy_step(self):
-        destroed = set()  # список всех уничтоженных врагами объектов
-        # соответсвие направления выстрела, повороту спрайта врага
-        angles = {(0, 1): 180, (0, -1): 0, (1, 0): 270, (-1, 0): 90}
-        for enemy in self.enemies:
-            x, y = enemy.get_pos()
-            x_dif = self.player_obj.x - enemy.x
-            y_dif = self.player_obj.y - enemy.y
-            # если враг на одной линии с игроком, то он безусловно стреляет
-            if x_dif == 0 or y_dif == 0:
-                enemy.Lose = False
-                enemy.triggered = True
-                enemy.triggered_vector = [0, 1] if x_dif == 0 and y_dif > 0 else [0, -1] \
-                    if x_dif == 0 and y_dif < 0 else [1, 0] if y_dif == 0 and x_dif > 0 else [-1, 0]
-                enemy.angle = angles[tuple(enemy.triggered_vector)]
-            # если разница с игроком в 1 клетку, враг пытается убить игрока, но только если он так уже не пытался
-            if abs(x_dif) <= 1 and enemy.triggered == False and enemy.Lose == False:
-                enemy.triggered_vector = [0, y_dif // abs(y_dif)]
-                enemy.triggered = True
-                enemy.angle = angles[tuple(enemy.triggered_vector)]
-            # если разница с игроком в 1 клетку, враг пытается убить игрока, но только если он так уже не пытался
-            if abs(y_dif) <= 1 and enemy.triggered == False and enemy.Lose == False:
-                enemy.triggered = True
-                enemy.triggered_vector = [x_dif // abs(x_dif), 0]
-                enemy.angle = angles[tuple(enemy.triggered_vector)]
-            # противник стреляет
-            if not enemy.Lose and enemy.triggered:  # если он видит игрока и прошлый раз он не промазал
-                enemy.triggered = False
-                enemy.Lose = True
-                x_v, y_v = enemy.triggered_vector  # задается направление стрельбы
-                x, y = enemy.get_pos()
-                while True:
-                    if not (0 <= x + x_v < self.width and 0 <= y + y_v < self.height):
-                        break
-                    # игрок не хранится в обычной сетке поля, поэтому отдельно проверяем его позицию
-                    if self.player_obj.get_pos() == (x + x_v, y + y_v):
-                        self.game_run = False
-                        self.board[y + y_v][x + x_v].append(EnemyPepl((y + y_v, x + x_v), enemy.angle, 10))
-                        break
-                    if len(self.board[y + y_v][x + x_v]) != 1:
-                        # если в списке объектов клетки только один, то там только обычное поле,
-                        # если нет - проверяем столкновение
-                        for i in self.board[y + y_v][x + x_v]:
-                            if isinstance(i, Wall) or isinstance(i, Enemy):
-                                destroed.add((y + y_v, x + x_v, i, enemy.angle))
-                            elif isinstance(i, Boom):
-                                self.explosion(x + x_v, y + y_v)
-                        break  # только объект класса SimpleField
-                    x += x_v
-                    y += y_v
-                    self.board[y][x].append(EnemyShootSprite((y, x), enemy.angle, SHOOT_LENGTH))
-                continue  # если враг выстрелил, то он уже не будет ходить
-            # проверка, может ли враг сократить дистацию с игроком, если не может, то уничтожает препятствие
-            if len([x for x in self.board[y + y_dif // abs(y_dif)][x]
-                    if not (isinstance(x, (Pepl, ShootSprite, EnemyPepl, EnemyShootSprite)))]) > 1 \
-                    and len([x for x in self.board[y][x + x_dif // abs(x_dif)] if not
-            (isinstance(x, (Pepl, ShootSprite, EnemyPepl, EnemyShootSprite)))]) > 1:
-                # очистка клетки
-                enemy.angle = angles[(0, y_dif // abs(y_dif))]
-                for i in self.board[y + y_dif // abs(y_dif)][x]:
-                    if isinstance(i, SimpleField):
-                        continue
-                    elif isinstance(i, Boom):
-                        self.explosion(x, y + y_dif // abs(y_dif))
-                        continue
-                    elif isinstance(i, Enemy):
-                        if i in self.enemies:
-                            self.enemies.remove(i)
-                    self.board[y + y_dif // abs(y_dif)][x].remove(i)
-                self.board[y + y_dif // abs(y_dif)][x].append(EnemyPepl((x, y + y_dif // abs(y_dif)), enemy.angle, 10))
-                continue
-            # сокращает дистанцию
-            if randint(0, 1) == 1:
-                if self.enemy_move(enemy, [x_dif // abs(x_dif), 0]):
-                    continue
-            if self.enemy_move(enemy, [0, y_dif // abs(y_dif)]):
-                continue
-            else:
-                self.enemy_move(enemy, [x_dif // abs(x_dif), 0])
-            # если враг сходил, то может выстрелить
-            enemy.Lose = False
-        # идем по списку уничтоженных объектов, вставляем в нужные места след лазера
-        for elem in destroed:
-            if isinstance(elem[2], Enemy):
-                if elem[2] in self.enemies:
-                    self.enemies.remove(elem[2])
-            if elem[2] in self.board[elem[0]][elem[1]]:
-                self.board[elem[0]][elem[1]].remove(elem[2])
-                self.board[elem[0]][elem[1]].append(EnemyPepl((elem[0], elem[1]), elem[3], 10))
-
-    # Функция, отслеживающая время отрисовки лазеров
-    def player_shoot(self, vector):  # функция стрельбы игрока
-        x_v, y_v = vector
-        x, y = self.player_obj.get_pos()  # получает информацию о игроке
-        while True:  # идет в сторону направления игрока
-            if not (0 <= x + x_v < self.width and 0 <= y + y_v < self.height):
-                break  # если лазер дошёл до края ничего не уничтожив, функция выключается
-            if len(self.board[y + y_v][x + x_v]) != 1:  # если в настоящей клетке больше одного объекта
-                for i in self.board[y + y_v][x + x_v]:  # (всегда есть одна обычная клетка)
-                    if isinstance(i, Wall) or isinstance(i, Enemy):  # если это стена или враг
-                        self.board[y + y_v][x + x_v].remove(i)  # то лазер его уничтожает
-                        if isinstance(i, Enemy):  # и также убирает врага из списка врагов
-                            if i in self.enemies:
-                                self.enemies.remove(i)
-                        self.board[y + y_v][x + x_v].append(
-                            Pepl((x + x_v, y + y_v), self.player_obj.angle, 10))  # и добавляет эффект взрыва
-                    elif isinstance(i, Boom):
-                        self.explosion(x + x_v, y + y_v)  # если же это бочка, то взрывает
-                break  # и т.к лазер попал, то функция выключается
-            x += x_v  # если не попал, то идёт дальше
-            y += y_v
-            self.board[y][x].append(ShootSprite((y, x), self.player_obj.angle, SHOOT_LENGTH))
-            # и добавляет эффект лазера
-
-    def shoot_render(self):  # функция уничтожения лазеров и взрывов, вреям анимации которых кончилось
-        for i in range(self.height):
-            for j in range(self.width):
-                for creature in self.board[i][j]:  # проходит по всему board
-                    if isinstance(creature, (ShootSprite, Pepl, EnemyShootSprite, EnemyPepl, Pepl_Boom)):
-                        if creature.timer > 0:  # если время еще осталось, то уменьшает его
-                            creature.decrease_timer()
-                        else:  # иначе, уничтожает объект
-                            self.board[i][j].remove(creature)
-
-    def explosion(self, x, y):  # функция взрыва бочки
-        for i in range(-1, 2):
-            for j in range(-1, 2):  # проходит по области возле бочки
-                if x + i < 0 or x + i >= len(self.board):
-                    continue  # проверка на край экрана
-                if y + j < 0 or y + j >= len(self.board):
-                    continue  # проверка на край экрана
-                for z in self.board[y + j][x + i]:  # проходит по клетке
-                    if isinstance(z, SimpleField):
-                        continue  # пропуск клеток поля
-                    elif isinstance(z, Boom):  # цепочка взрывов, если задела вторую бочку
-                        self.board[y + j][x + i].remove(z)
-                        self.explosion(x + i, y + j)
-                        return
-                    elif isinstance(z, Enemy):  # уничтожение врага
-                        if z in self.enemies:
-                            self.enemies.remove(z)
-                    self.board[y + j][x + i].remove(z)  # уничтожение коробки, если она там есть
-                self.board[y + j][x + i].append(Pepl_Boom((x + i, y + j), 0, 10))  # создание эффекта взрыва
-                if self.player_obj.get_pos() == (x + i, y + j):  # если бочка взорвала игрока, игра заканчивается
-                    self.player_obj.alive = False
-                    self.game_run = False
-
-    def render(self, screen):  # функция рендера изображения
-        screen.fill('black')  # очистка экрана
-        self.sprites.empty()  # очистка списка спрайтов
-        self.sprites.add(StandartSprite(load_image(config.background_sprite), (0, 0), 0))  # добавление фона
-        for i in range(self.height):
-            for j in range(self.width):  # проходит по board
-                for creature in self.board[i][j]:  # и добавляет соотвестсвующий спрайт
-                    self.sprites.add(StandartSprite(creature.image,
-                                                    (j * self.cell_size + self.left_shift,
-                                                     i * self.cell_size + self.top_shift), creature.angle))
-        self.sprites.add(StandartSprite(self.player_obj.image,  # отдельная обработка игрока, он не хранится в board
-                                        (self.player_obj.x * self.cell_size + self.left_shift,
-                                         self.player_obj.y * self.cell_size + self.top_shift), self.player_obj.angle))
-        self.sprites.update()  # обновление списка спрайтов
-        self.sprites.draw(screen)  # отрисовка
-
-    def add_full_screen(self, screen, path, group, alpha=250):  # функция добавления фона
-        image = pygame.transform.scale(load_image(path), (screen.get_width(), screen.get_height()))  # создание
-        image.set_alpha(alpha)  # нужного изобрадения фона
-        group.add(StandartSprite(image, (0, 0), 0))
-        # self.sprites.draw(screen)  # отрисовка
-
-    def render_heating(self, screen):  # функция отрисовки нагрева
-        image = load_image('heat' + str(self.heating) + '.png')  # выбор цифры, в зависимости от нагрева
-        self.sprites.add(StandartSprite(image, (810, 280), 0))
-        self.sprites.draw(screen)  # отрисовка
-
-    def render_player_score(self, screen):  # функция отрисовки счёта игрока
-        score = self.player_obj.score  # получение информации о счёте
-        if len(str(score)) == 1:  # если счет состоит из одной цифры, она узкая и русуем большим шрифтом
-            font = pygame.font.Font('score_font.ttf', 133)  # то шрифт больше
-            text = font.render(str(score), True, (74, 130, 203))
-            screen.blit(text, (10, 305))  # отрисовка
-        elif len(str(score)) == 2:
-            font = pygame.font.Font('score_font.ttf', 75)  # иначе размер меньше
-            text = font.render(str(score), True, (74, 130, 203))
-            screen.blit(text, (7, 310))  # отрисовка
+    if entry['alpha'] is not None:
+        image.set_alpha(entry['alpha'])
+    if entry['frame'] is None:
+        image_cache.put(bundle_key(entry), image)
+    else:
+        frames.setdefault((entry['name'], entry['color_key']), {})[entry['frame']] = image
+
+
+def store_frames(frames):  # кадры анимаций из load_bundle_entry в sheet_frames
+    for key, images in frames.items():
+        sheet_frames[key] = [images[i] for i in sorted(images)]
+
+
+# загружает весь набор сразу, возвращает число загруженных изображений
+def load_bundle(path):
+    bundle = open_bundle(path)
+    if bundle is None:
+        return 0
+    data, entries = bundle
+    frames = {}
+    for entry in entries:
+        load_bundle_entry(data, entry, frames)
+    store_frames(frames)
+    data.close()
+    return len(entries)
+
+
+# фоновая загрузка изображений игры: файлы читаются и растягиваются на пуле потоков (decode_image),
+# а в формат окна конвертируются в основном потоке в poll(), который вызывается каждый кадр
+# изображения из набора (bundle из open_bundle) уже декодированы, poll() конвертирует их понемногу,
+# не дольше budget секунд за вызов; изображения, которые уже есть в кэше, не загружаются
+class AssetLoader:
+    def __init__(self, screen_size, workers=4, bundle=None):
+        self.data, entries = bundle or (None, [])
+        self.entries = deque(entry for entry in entries
+                             if entry['frame'] is not None or bundle_key(entry) not in image_cache)
+        self.frames = {}  # кадры анимаций из набора, попадают в sheet_frames, когда набор загружен
+        bundled = {bundle_key(entry) for entry in entries}
+        bundled_sheets = {(entry['name'], entry['color_key']) for entry in entries if entry['frame'] is not None}
+        keys = asset_keys(screen_size)
+        keys.extend((cls.sprite, cls.color_key, None, None) for cls in cell_object_classes()
+                    if 'sprite' in cls.__dict__ and cls.sheet_grid is not None
+                    and (cls.sprite, cls.color_key) not in sheet_frames
+                    and (cls.sprite, cls.color_key) not in bundled_sheets)  # листы анимаций не из набора
+        keys = [key for key in dict.fromkeys(keys) if key not in image_cache and key not in bundled]
+        self.total = len(keys) + len(self.entries)
+        self.done = 0
+        self.pool = ThreadPoolExecutor(workers)
+        decoding = {}  # (имя, размер) -> Future, один файл с разной прозрачностью читается один раз
+        for name, _, size, _ in keys:
+            if (name, size) not in decoding:
+                decoding[name, size] = self.pool.submit(decode_image, name, size)
+        self.pending = deque((key, decoding[key[0], key[2]]) for key in keys)
+
+    @property
+    def ready(self):
+        return not self.pending and not self.entries
+
+    @property
+    def progress(self):  # от 0 до 1
+        return self.done / self.total if self.total else 1
+
+    def poll(self, budget=1 / 60):  # конвертирует уже прочитанные изображения, возвращает ready
+        while self.pending and self.pending[0][1].done():
+            key, future = self.pending.popleft()
+            image_cache.put(key, prepare_image(future.result(), key[1], key[3]))
+            self.done += 1
+        deadline = time.perf_counter() + budget
+        while self.entries and time.perf_counter() < deadline:
+            load_bundle_entry(self.data, self.entries.popleft(), self.frames)
+            self.done += 1
+        if self.data is not None and not self.entries:
+            store_frames(self.frames)
+            self.data.close()
+            self.data = None
+        if not self.pending:
+            self.pool.shutdown(wait=False)  # звуки на том же пуле могут ещё грузиться
+        return self.ready
+
+    def wait(self, timeout):  # ждёт следующее прочитанное изображение не дольше timeout секунд
+        if self.pending and not self.entries:  # пока есть изображения набора, ждать нечего
+            futures.wait([self.pending[0][1]], timeout)
+
+
+# инициализация pygame, создание окна и загрузка изображений
+# assets=False - изображения объектов не загружаются, это делает AssetLoader и потом load_assets()
+def init_display(assets=True):
+    global screen
+    start = time.perf_counter()
+    pygame.mixer.pre_init(config.mixer_frequency, -16, 2, config.mixer_buffer)
+    pygame.init()
+    if not config.audio:
+        pygame.mixer.quit()
+    screen = pygame.display.set_mode(size)
+    pygame.display.set_caption('Superhot 2d')
+    if not assets:  # набор загрузит AssetLoader
+        return screen
+    bundled = load_bundle(config.asset_bundle)
+    load_assets()
+    if config.debug_mode:
+        print(f'Assets loaded in {(time.perf_counter() - start) * 1000:.1f} ms, {bundled} images from bundle')
+    return screen
+
+# фильтры, накладываемые поверх всего экрана, и их прозрачность
+FILTER_LAYERS = ((config.glass, 45), (config.pixels, 20))
+END_SCREEN_ALPHA = 170  # прозрачность экранов смерти и победы
+
+
+# экраны конца игры, заранее собранные вместе с фильтрами в одну поверхность
+# с предумноженной прозрачностью, рисуются одним блитом с BLEND_PREMULTIPLIED
+# собираются при первом показе и живут, пока не изменится размер окна
+class EndScreens:
+    def __init__(self):
+        self.size = None
+        self.screens = {}  # (победа, фильтры) -> поверхность
+
+    def get(self, size, win, filters):
+        if size != self.size:
+            self.size = size
+            self.screens.clear()
+        if (win, filters) not in self.screens:
+            self.screens[win, filters] = self.compose(size, win, filters)
+        return self.screens[win, filters]
+
+    def compose(self, size, win, filters):
+        layers = [(config.game_win_screen if win else config.game_over_sprite, END_SCREEN_ALPHA)]
+        if filters:
+            layers.extend(FILTER_LAYERS)
+        result = pygame.Surface(size, pygame.SRCALPHA)  # полностью прозрачная
+        for name, alpha in layers:
+            layer = load_image(name, size=size).copy()  # копия, кэшированное изображение менять нельзя
+            layer.fill((255, 255, 255, alpha), special_flags=pygame.BLEND_RGBA_MULT)  # общая прозрачность
+            result.blit(layer.premul_alpha(), (0, 0), special_flags=pygame.BLEND_PREMULTIPLIED)
+        return result
+
+
+# звуки игры: фоновая музыка играет потоком через pygame.mixer.music и не декодируется в память целиком,
+# короткие эффекты грузятся при первом воспроизведении; без звука (config.audio = 0 или нет устройства)
+# методы ничего не делают
+class Sounds:
+    def __init__(self, enabled=True, volume=1.0):
+        self.enabled = enabled and pygame.mixer.get_init() is not None
+        self.volume = volume
+        self.music_loaded = False
+        self.effects = {}  # путь -> pygame.mixer.Sound
+        self.loading = {}  # путь -> Future со звуком, который грузится в фоне
+
+    def preload(self, pool, paths):  # начать фоновую загрузку эффектов на пуле потоков
+        if self.enabled:
+            for path in paths:
+                if path not in self.effects and path not in self.loading:
+                    self.loading[path] = pool.submit(pygame.mixer.Sound, path)
+
+    def play_music(self):  # с начала и по кругу
+        if not self.enabled:
+            return
+        if not self.music_loaded:
+            pygame.mixer.music.load(config.game_music)
+            pygame.mixer.music.set_volume(self.volume)
+            self.music_loaded = True
+        pygame.mixer.music.play(-1)
+
+    def stop_music(self):
+        if self.music_loaded:
+            pygame.mixer.music.stop()
+
+    def play(self, path):
+        if not self.enabled:
+            return
+        sound = self.effects.get(path)
+        if sound is None:
+            loading = self.loading.pop(path, None)
+            sound = self.effects[path] = loading.result() if loading else pygame.mixer.Sound(path)
+            sound.set_volume(self.volume)
+        sound.play()
+
+
+# движки поля, выбираются в config.board_engine
+BOARD_ENGINES = {'list': Board, 'array': ArrayBoard}
+
+# действия игрока, которые записываются в повтор
+TURN_UP, TURN_DOWN, TURN_LEFT, TURN_RIGHT, MOVE, SHOOT, PRESS = range(7)  # PRESS - любая другая клавиша
+TURN_VECTORS = {TURN_UP: (0, -1), TURN_DOWN: (0, 1), TURN_LEFT: (-1, 0), TURN_RIGHT: (1, 0)}
+KEY_ACTIONS = {config.move_up: TURN_UP, config.move_down: TURN_DOWN, config.move_left: TURN_LEFT,
+               config.move_right: TURN_RIGHT, config.move_button: MOVE, config.shot_button: SHOOT}
+
+# что показывать на экране после кадра
+PLAYING, GAME_OVER, END_SCREEN, NEW_GAME = range(4)
+
+
+# игровая логика одного кадра без окна и звука: обработка действий игрока,
+# заморозка управления на время анимаций, ход врагов и переход к новой игре
+# один и тот же код работает в main() и при воспроизведении повтора
+class Game:
+    def __init__(self, board, recording=None, profiler=None):
+        self.board = board
+        self.recording = recording  # Recording, в которую пишутся действия, или None
+        self.profiler = profiler or FrameProfiler()  # по умолчанию выключенный
+        self.frame = 0  # номер кадра, кадры простоя, которые пропускаются, не считаются
+        self.freeze = 0  # заморозка управления на время проигрывания анимаций
+        self.game_over_freeze = 5  # заморозка анимации на пятом кадре перед экраном смерти
+        self.step = False  # враги ещё должны сходить в ответ на ход игрока
+        self.game_over = False  # отображается ли экран смерти
+        self.pressed = False  # была ли нажата какая-либо клавиша в этом кадре
+        self.player_vector = [0, -1]  # вектор игрока для опеределения поворота спрайта
+
+    def handle(self, action):  # действие игрока в текущем кадре
+        if self.recording is not None:
+            self.recording.actions.append((self.frame, action))
+        self.pressed = True
+        board = self.board
+        if not board.game_run or self.freeze:
+            return  # игра закончилась или проигрываются анимации
+        if action in TURN_VECTORS:
+            self.player_vector = list(TURN_VECTORS[action])
+            board.player_obj.angle = VECTOR_ANGLES[TURN_VECTORS[action]]
+        elif action == MOVE:
+            try:
+                board.move_player(self.player_vector)
+            except (BorderError, WallStepError):
+                return
+            board.heating = 0
+            self.step = True
+            self.freeze = TURN_FREEZE
+        elif action == SHOOT:
+            board.player_shoot(self.player_vector)
+            board.heating += 1
+            self.step = True
+            self.freeze = TURN_FREEZE
+            if board.heating == MAX_HEATING:
+                board.game_run = False
+
+    def update(self):  # всё, что происходит в кадре после ввода, возвращает, что показывать на экране
+        board = self.board
+        board.update_player_score()
+        if board.game_run or self.game_over_freeze > 0:  # анимации выстрела
+            board.shoot_render()
+            result = PLAYING
+        elif not self.game_over:  # ещё не показывали экрана смерти
+            self.game_over = True
+            result = GAME_OVER
+        elif self.pressed:  # если press any key, начинаем новую игру
+            self.player_vector = [0, -1]
+            board.new_game(restart=bool(board.check_enemy_lives()))
+            self.game_over = False
+            self.step = False
+            self.game_over_freeze = 5
+            result = NEW_GAME
         else:
-            font = pygame.font.Font('score_font.ttf', 50)  # иначе размер меньше
-            text = font.render(str(score), True, (74, 130, 203))
-            screen.blit(text, (6, 320))  # отрисовка
-
+            result = END_SCREEN
+        self.profiler.mark('shoot_render')
+        if self.freeze:  # если freeze > 0,  уменьшаем его
+            self.freeze -= 1
+        if not board.game_run:  # если уже умерли
+            self.game_over_freeze -= 1
+        if self.step and self.freeze == ENEMY_STEP_FREEZE and board.game_run:  # после рендера анимации игрока,
+            # делают ход враги и ещё 10 итераций идет анимация врагов
+            board.enemy_step()
+            self.step = False
+        board.check_enemy_lives()  # эта функция остановит игру, если не осталось врагов
+        if not board.game_run:  # ход закончил игру (перегрев, последний враг, взрыв), враги уже не ходят
+            self.step = False
+        self.profiler.mark('enemy_step')
+        self.pressed = False
+        self.frame += 1
+        return result
 
-    def get_cell(self, pos):  # функция для получения координаты клетки по координатам нажатия мышки
-        x_index = (pos[0] - self.left_shift) // self.cell_size
-        y_index = (pos[1] - self.top_shift) // self.cell_size
+    def is_idle(self):  # нет анимаций и ходов врагов, игрок думает или смотрит на экран конца игры
+        board = self.board
+        return not self.freeze and not self.step and (
+                self.game_over or board.game_run and not board.has_active_effects())
 
-        if 0 <= x_index < self.width and 0 <= y_index < self.height:  # если нажали на поле
-            return x_index, y_index
-        return None
 
-    def add_object_to_cell(self, obj, pos=None):
-        # метод для генерации поля, проверяет пустая ли клетка позиции
-        # если да, то добавляет объект и возвращает True, иначе - возвращает False
-        # если pos не передали генерирует сама
-        if pos is None:
-            pos = randint(0, self.height - 1), randint(0, self.width - 1)
-        if pos == self.player_obj.get_pos():
-            return False
-        if len(self.board[pos[1]][pos[0]]) == 1:
-            self.board[pos[1]][pos[0]].append(obj)
-            return True
-        return False
-
-    def generate_field(self, box_count=30, boom_count=7, enemy_count=7):  # функция генерации поля
-        self.board = [[[] for _ in range(self.width)] for _ in range(self.height)]  # создание новго списка board
-        for i in range(self.height):
-            for j in range(self.width):
-                self.board[i][j].append(SimpleField())  # заполнение его стандартными клетками
-        for i in range(box_count):
-            result = False
-            while not result:
-                result = self.add_object_to_cell(Wall())  # создание коробок сколько требуется
-        for i in range(boom_count):
-            result = False
-            while not result:
-                result = self.add_object_to_cell(Boom())  # создание бочек сколько требуется
-        for i in range(enemy_count):  # создание врагов сколько требуется
-            result = False
-            while not result:
-                x, y = randint(0, self.height - 1), randint(0, self.width - 1)
-                new_enemy = Enemy((x, y), choice([0, 90, 180, 270]))  # задание угла и координат врагу
-                result = self.add_object_to_cell(new_enemy, pos=(x, y))
-            self.enemies.append(new_enemy)  # добавление в список врагов
-
-    def check_actions(self):  # функция проверки
-        x, y = self.player_obj.x, self.player_obj.y
-        for obj in self.board[y][x]:  # не находится ли игрок внутри чегото
-            if isinstance(obj, Creature):  # если находитя, то игра заканчивается
-                self.player_obj.alive = False
-                self.game_run = False
-
-    def check_enemy_lives(self):  # функция для проверки
-        if not len(self.enemies):  # возвращает число живых врагов
-            self.game_run = False
-        return len(self.enemies)
-
-    def move_player(self, vector):  # функция перемещения игрока
-        x_v, y_v = vector
-        x, y = self.player_obj.get_pos()
-        if not (0 <= x + x_v < self.width and 0 <= y + y_v < self.height):
-            raise BorderError  # если он не вышел за границы карты
-        for cell_obj in self.board[y + y_v][x + x_v]:  # и не идёт в препятствие
-            if isinstance(cell_obj, Wall) or isinstance(cell_obj, Boom) or isinstance(cell_obj, Enemy):
-                raise WallStepError
-        self.player_obj.set_pos(x + x_v, y + y_v)  # то двигается
-        return True
-
-    def new_game(self, screen, restart=True):  # фунуция для создание новго уровня
-        self.enemies = []  # обновление списка врагов
-
-        self.player_obj.set_pos(randint(0, len(self.board[0]) - 1), randint(0, len(self.board) - 1))
-        self.player_obj.angle = 0  # создание игрока
-        if restart:
-            self.player_obj.score = 0  # если игрок умер, а не перешёл на следующий уровень
-        self.heating = 0
-        self.game_run = True  # обновление переменных
-
-        self.enemies_count = 7
-        self.past_enemies_count = self.enemies_count
-        self.generate_field(enemy_count=self.enemies_count)  # создание поля
-        self.render(screen)
-        self.render_heating(screen)  # отрисовка
-
-    def update_player_score(self):  # функция для обновления счёта игрока
-        self.player_obj.score += self.past_enemies_count - self.check_enemy_lives()  # прошлый счёт +
-        self.past_enemies_count = self.check_enemy_lives()  # количество врагов всего - количество живых врагов
+# полоса загрузки внизу стартового экрана, progress от 0 до 1, возвращает её прямоугольник
+def draw_progress(surface, progress):
+    width, height = surface.get_size()
+    bar = pygame.Rect(width // 4, height - 40, width // 2, 12)
+    pygame.draw.rect(surface, (40, 40, 40), bar)
+    pygame.draw.rect(surface, (255, 255, 255), (bar.x, bar.y, round(bar.w * progress), bar.h))
+    return bar
 
 
 def main():
+    start = time.perf_counter()
+    init_display(assets=False)
     running = True
     fps = 30  # количество кадров в секунду
     clock = pygame.time.Clock()
-    screen.blit(pygame.transform.scale(load_image(config.start_screen),  # РЕНДЕР СТАРТОВОГО ЭКРАНА
-                                       (screen.get_width(), screen.get_height())), (0, 0))
+    bundle = open_bundle(config.asset_bundle)
+    start_key = config.start_screen, None, screen.get_size(), None
+    for entry in bundle[1] if bundle else ():  # из набора сразу нужен только стартовый экран
+        if bundle_key(entry) == start_key:
+            load_bundle_entry(bundle[0], entry, {})
+    screen.blit(load_image(*start_key), (0, 0))  # РЕНДЕР СТАРТОВОГО ЭКРАНА
+    pygame.display.flip()
+    # стартовый экран уже виден, остальные изображения и звуки грузятся в фоне
+    loader = AssetLoader(screen.get_size(), config.loader_workers, bundle)
+    sounds = Sounds(config.audio, config.game_volume)
+    sounds.preload(loader.pool, (config.start_sound, config.death_sound, config.win_sound))
 
     # группа спрайтов со спрайтами, которые постоянно есть на экране
-    game_over_filt = pygame.sprite.Group()
+    end_screens = EndScreens()
     filters = pygame.sprite.Group()
-    # фильтр стекла
-    image = pygame.transform.scale(load_image(config.glass), (screen.get_width(), screen.get_height()))
-    image.set_alpha(45)  # установка прозрачности
-    filters.add(StandartSprite(image, (0, 0), 0))
-    # фильтр пикселей
-    image = pygame.transform.scale(load_image(config.pixels), (screen.get_width(), screen.get_height()))
-    image.set_alpha(20)  # установка прозрачности
-    filters.add(StandartSprite(image, (0, 0), 0))
-    filters.draw(screen)
-
-    pygame.display.flip()
     start_screen = True
     isFilter = True
-    while start_screen:  # стартовый экран
-        for event in pygame.event.get():
+    loaded = False  # изображения загружены и розданы классам
+    redraw = False  # перерисовать стартовый экран целиком
+    while True:  # стартовый экран, игра начинается после нажатия клавиши и окончания загрузки
+        if not loaded and loader.poll():
+            loaded = redraw = True
+            load_assets()
+            for name, alpha in FILTER_LAYERS:  # фильтры стекла и пикселей с прозрачностью
+                filters.add(StandartSprite(load_image(name, size=screen.get_size(), alpha=alpha), (0, 0), 0))
+            if config.debug_mode:
+                print(f'Assets loaded in {(time.perf_counter() - start) * 1000:.1f} ms')
+        if not start_screen and loaded:
+            break
+        if redraw:
+            screen.blit(load_image(config.start_screen, size=screen.get_size()), (0, 0))
+            if isFilter:
+                filters.draw(screen)
+            pygame.display.flip()
+            redraw = False
+        if loaded:
+            # на стартовом экране ничего не анимируется, поэтому просто ждём событий, не нагружая процессор
+            events = [pygame.event.wait()] + pygame.event.get()
+        else:  # обновляем только полосу загрузки и ждём следующее изображение не дольше кадра
+            pygame.display.update(draw_progress(screen, loader.progress))
+            events = pygame.event.get()
+            loader.wait(1 / fps)
+        for event in events:
             if event.type == pygame.QUIT:
                 pygame.quit()
                 quit()
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_k:
-                    if isFilter:
-                        screen.blit(pygame.transform.scale(load_image(config.start_screen),  # РЕНДЕР СТАРТОВОГО ЭКРАНА
-                                                           (screen.get_width(), screen.get_height())), (0, 0))
-                    else:
-                        filters.draw(screen)
-                    pygame.display.flip()
                     isFilter = not isFilter
+                    redraw = True
                 else:
                     start_screen = False
 
-    board = Board(n1, n2, cell_size=cs, left_shift=65, top_shift=75)  # инициализация board
+    # вся случайность поля идёт из модуля random, поэтому партию можно повторить по зерну и действиям
+    seed = random.getrandbits(32)
+    random.seed(seed)
+    board = BOARD_ENGINES[config.board_engine](n1, n2, cell_size=cs, left_shift=65, top_shift=75,
+                                               view_size=view_size)  # инициализация board
+    recording = None
+    if config.record_file:
+        recording = Recording(seed, n1, n2, config.board_engine, board.enemy_ai)
     board.new_game(screen)  # запуск игры на главном экране
-    freeze = 0  # заморозка управления на время проигрывания анимаций
-    game_over_freeze = 5  # заморозка анимации на пятом кадре перед экраном смерти
-    step = False
-    # загрузка звука
-    game_music = pygame.mixer.Sound(config.game_music)
-    start_sound = pygame.mixer.Sound(config.start_sound)
-    death_sound = pygame.mixer.Sound(config.death_sound)
-    win_sound = pygame.mixer.Sound(config.win_sound)
-    game_over = False  # отображается ли экран смерти
+    profiler = FrameProfiler(config.frame_profiler, config.profiler_csv)
+    instrumentation.start_profile()
+    game = Game(board, recording, profiler)
     board.render(screen)  # рендер экрана
     board.render_heating(screen)
-    player_vector = [0, -1]  # вектор игрока для опеределения поворота спрайта
-    game_music.play(-1)  # установка постоянного повторения музыки
-    death_sound.set_volume(config.game_volume)  # установка громкости
-    start_sound.set_volume(config.game_volume)
-    game_music.set_volume(config.game_volume)
-    win_sound.set_volume(config.game_volume)
+    sounds.play_music()  # установка постоянного повторения музыки
+    was_idle = False  # был ли прошлый кадр кадром простоя
+    idle_time = 0  # сколько секунд ждали ввода вместо отрисовки кадров
     while running:  # основной игровой цикл
-        pressed = False  # была ли нажата какая-либо клавиша в данной итерации
-        for event in pygame.event.get():
+        idle = game.is_idle()
+        if idle and was_idle:  # последний кадр уже на экране, ждём ввода вместо перерисовки
+            waited = time.perf_counter()
+            event = pygame.event.wait(config.idle_timeout)
+            idle_time += time.perf_counter() - waited
+            if event.type == pygame.NOEVENT:
+                continue
+            events = [event] + pygame.event.get()
+        else:
+            events = pygame.event.get()
+        was_idle = idle
+        profiler.start_frame()
+        for event in events:
             if event.type == pygame.QUIT:  # закрытие окна
                 running = False
                 continue
@@ -576,86 +474,75 @@ def main():
                     if not board.get_cell(event.pos) is None:
                         print(board.board[board.get_cell(event.pos)[1]][board.get_cell(event.pos)[0]])
             if event.type == pygame.KEYDOWN:  # нажатия клавиш
-                if board.game_run:
-                    # блок перемещения игрока
-                    try:
-                        if not freeze:  # если не проигрываются анимации
-                            if event.key == config.move_up:
-                                player_vector = [0, -1]
-                                board.player_obj.angle = 0
-                            elif event.key == config.move_down:
-                                player_vector = [0, 1]
-                                board.player_obj.angle = 180
-                            elif event.key == config.move_left:
-                                player_vector = [-1, 0]
-                                board.player_obj.angle = 90
-                            elif event.key == config.move_right:
-                                player_vector = [1, 0]
-                                board.player_obj.angle = 270
-                            elif event.key == config.move_button:
-                                board.move_player(player_vector)
-                                step = True
-                                board.heating = 0
-                                freeze = 20
-                            elif event.key == config.shot_button:
-                                board.player_shoot(player_vector)
-                                step = True
-                                board.heating += 1
-                                freeze = 20
-                                if board.heating == 3:
-                                    board.game_run = False
-                    except BorderError:
-                        pass
-                    except WallStepError:
-                        pass
-                pressed = True  # на этой итерации была нажата клавиша
                 if event.key == pygame.K_k:
                     isFilter = not isFilter
-                    pressed = False
+                    board.full_redraw = True  # фильтры меняют весь экран
+                elif event.key == config.save_button:
+                    if board.game_run and not game.freeze and not game.step:  # сохраняемся только между ходами
+                        with open(config.save_file, 'wb') as file:
+                            file.write(board.dump_state())
+                elif event.key == config.load_button:
+                    # состояние из сохранения не повторить по зерну, поэтому при записи повтора загрузка выключена
+                    if recording is None and os.path.exists(config.save_file):
+                        with open(config.save_file, 'rb') as file:
+                            board.restore_state(file.read())
+                        game = Game(board, profiler=profiler)
+                        board.full_redraw = True
+                elif event.key == config.instrumentation_button:
+                    instrumentation.print_report()
+                    instrumentation.start_profile()
+                elif event.key == config.profiler_button:
+                    profiler.toggle_overlay()
+                    board.full_redraw = True  # убрать оверлей с экрана
+                else:  # перемещение игрока, выстрел или press any key на экране конца игры
+                    game.handle(KEY_ACTIONS.get(event.key, PRESS))
+        profiler.mark('events')
         board.render(screen)  # рендер основного экрана
+        profiler.mark('render')
         board.render_heating(screen)
-        board.update_player_score()
+        profiler.mark('heating')
+        shown = game.update()
         board.render_player_score(screen)
-        if board.game_run or game_over_freeze > 0:  # анимации выстрела и фильтр
-            board.shoot_render()
+        profiler.mark('score')
+        if shown == PLAYING:  # анимации выстрела и фильтр
             if isFilter:
                 filters.draw(screen)
+        elif shown == NEW_GAME:
+            sounds.play_music()
+            sounds.play(config.start_sound)
+            board.render(screen)
+            board.render_heating(screen)
         else:
-            game_over_filt.empty()  # фильтр экрана смерти
-            if board.check_enemy_lives():  # если >0 врагов, то это проигрыш
-                board.add_full_screen(screen, config.game_over_sprite, game_over_filt, alpha=170)
-            else:  # иначе победа
-                board.add_full_screen(screen, config.game_win_screen, game_over_filt, alpha=170)
-            game_over_filt.draw(screen)
-            if isFilter:
-                filters.draw(screen)
-            if not game_over:  # если ещё не показывали экрана смерти
-                game_music.stop()  # останавливаем музыку
+            # экран смерти или победы (если врагов не осталось) вместе с фильтрами, одним блитом
+            end_screen = end_screens.get(screen.get_size(), not board.check_enemy_lives(), isFilter)
+            screen.blit(end_screen, (0, 0), special_flags=pygame.BLEND_PREMULTIPLIED)
+            board.full_redraw = True  # экран конца игры перекрывает всё окно
+            if shown == GAME_OVER:  # экран смерти показывается первый раз
+                sounds.stop_music()  # останавливаем музыку
                 if board.check_enemy_lives():  # если >0 врагов, то это проигрыш
-                    death_sound.play()
+                    sounds.play(config.death_sound)
                 else:  # иначе победа
-                    win_sound.play()
-                game_over = True  # экран смерти отрендерен
-            else:
-                if pressed:  # если press any key, начинаем новую игру
-                    game_music.play(-1, 0)
-                    start_sound.play(0, 0)
-                    player_vector = [0, -1]
-                    board.new_game(screen, restart=bool(board.check_enemy_lives()))
-                    game_over = False
-                    game_over_freeze = 5
-        if freeze:  # если freeze > 0,  уменьшаем его
-            freeze -= 1
-        if not board.game_run:  # если уже умерли
-            game_over_freeze -= 1
-        if step and freeze == 9 and board.game_run:  # после рендера анимации игрока,
-            # делают ход враги и ещё 10 итераций идет анимация врагов
-            board.enemy_step()
-            step = False
-        board.check_enemy_lives()  # эта функция остановит игру, если не осталось врагов
-        pygame.display.flip()
+                    sounds.play(config.win_sound)
+        profiler.mark('filters')
+        profiler.draw(screen)
+        profiler.mark('overlay')
+        dirty_rects = board.pop_dirty_rects()
+        if config.dirty_rect_rendering and dirty_rects is not None and not profiler.overlay:
+            pygame.display.update(dirty_rects)  # обновляем только изменившиеся области
+        else:
+            pygame.display.flip()
+        profiler.mark('flip')
+        profiler.end_frame(len(board.sprites))
+        instrumentation.frame_done()
         clock.tick(fps)
 
+    if config.debug_mode:
+        print('Skipped idle frames:', round(idle_time * fps))
+    if recording is not None:
+        recording.frames = game.frame
+        recording.final_hash = board.state_hash()
+        recording.save(config.record_file)
+    profiler.close()
     pygame.quit()
 
 
@@ -0,0 +1,94 @@
+import pygame
+import time
+import csv
+from collections import deque
+
+
+# профайлер кадра: время каждой фазы игрового цикла (от прошлой отметки mark до текущей),
+# оверлей со временем кадра, перцентилями по последним кадрам и разбивкой по фазам,
+# запись времени фаз каждого кадра в csv; выключенный только проверяет флаг
+class FrameProfiler:
+    phases = ('events', 'render', 'heating', 'shoot_render', 'enemy_step', 'score', 'filters', 'overlay', 'flip')
+    history = 300  # по скольким последним кадрам считается статистика
+    refresh = 15  # раз во сколько кадров перерисовывается текст оверлея
+    text_color = (255, 255, 255)
+    background = (0, 0, 0, 170)
+
+    def __init__(self, overlay=False, csv_path=''):
+        self.overlay = overlay  # показывать ли оверлей
+        self.csv_file = None
+        self.csv = None
+        if csv_path:
+            self.csv_file = open(csv_path, 'w', newline='')
+            self.csv = csv.writer(self.csv_file)
+            self.csv.writerow(('frame', 'total_ns') + self.phases + ('sprites',))
+        self.enabled = overlay or self.csv is not None  # замеряем, только если есть куда показать
+        self.frames = deque(maxlen=self.history)  # (время кадра, {фаза: время}) в наносекундах
+        self.frame = 0
+        self.times = {}
+        self.last = 0
+        self.sprites = 0
+        self.font = None
+        self.image = None  # отрисованный текст оверлея
+
+    def start_frame(self):
+        if self.enabled:
+            self.times = {}
+            self.last = time.perf_counter_ns()
+
+    def mark(self, phase):  # закончилась фаза phase
+        if self.enabled:
+            now = time.perf_counter_ns()
+            self.times[phase] = self.times.get(phase, 0) + now - self.last
+            self.last = now
+
+    def end_frame(self, sprites):
+        if not self.enabled:
+            return
+        total = sum(self.times.values())
+        self.frames.append((total, self.times))
+        self.sprites = sprites
+        if self.csv is not None:
+            self.csv.writerow([self.frame, total] + [self.times.get(phase, 0) for phase in self.phases] + [sprites])
+        self.frame += 1
+
+    def toggle_overlay(self):
+        self.overlay = not self.overlay
+        self.enabled = self.overlay or self.csv is not None
+        self.image = None
+        self.start_frame()  # включили посреди кадра - считаем его отсюда
+
+    def percentiles(self, *levels):  # перцентили времени кадра
+        totals = sorted(total for total, _ in self.frames)
+        return [totals[min(len(totals) - 1, len(totals) * level // 100)] if totals else 0 for level in levels]
+
+    def draw(self, screen):
+        if not self.overlay:
+            return
+        if self.image is None or self.frame % self.refresh == 0:
+            self.image = self.render_overlay()
+        screen.blit(self.image, (0, 0))
+
+    def render_overlay(self):
+        if self.font is None:
+            self.font = pygame.font.Font(None, 20)  # стандартный шрифт pygame
+        count = max(len(self.frames), 1)
+        p50, p95, p99 = self.percentiles(50, 95, 99)
+        lines = [f'frame {self.frames[-1][0] / 1e6 if self.frames else 0:.2f} ms  sprites {self.sprites}',
+                 f'p50 {p50 / 1e6:.2f}  p95 {p95 / 1e6:.2f}  p99 {p99 / 1e6:.2f} ms']
+        for phase in self.phases:
+            mean = sum(times.get(phase, 0) for _, times in self.frames) / count
+            lines.append(f'{phase} {mean / 1e6:.2f} ms')
+        images = [self.font.render(line, True, self.text_color) for line in lines]
+        image = pygame.Surface((max(line.get_width() for line in images) + 10,
+                                sum(line.get_height() for line in images) + 10), pygame.SRCALPHA)
+        image.fill(self.background)
+        y = 5
+        for line in images:
+            image.blit(line, (5, y))
+            y += line.get_height()
+        return image
+
+    def close(self):
+        if self.csv_file is not None:
+            self.csv_file.close()
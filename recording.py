@@ -0,0 +1,48 @@
+import struct
+
+
+# запись партии: зерно random, настройки поля и действия игрока с номерами кадров
+# в файле: заголовок, по 5 байт на действие, в конце число кадров и хеш итогового состояния
+class Recording:
+    magic = b'SH2R'
+    version = 1
+    header = struct.Struct('<4sBIHHBB')  # magic, версия, зерно, ширина, высота, движок, режим врагов
+    action = struct.Struct('<IB')  # кадр, действие
+    end = 255  # действие-маркер конца записи, после него хеш
+    # коды движка и режима врагов в файле, порядок менять нельзя, иначе старые записи прочитаются неверно
+    engines = ('list', 'array')
+    enemy_ais = ('greedy', 'flow')
+
+    def __init__(self, seed, width, height, engine='list', enemy_ai='greedy'):
+        self.seed = seed
+        self.width = width
+        self.height = height
+        self.engine = engine
+        self.enemy_ai = enemy_ai
+        self.actions = []  # (кадр, действие)
+        self.frames = 0  # сколько кадров длилась партия
+        self.final_hash = b''  # Board.state_hash() в конце партии
+
+    def save(self, path):
+        with open(path, 'wb') as file:
+            file.write(self.header.pack(self.magic, self.version, self.seed, self.width, self.height,
+                                        self.engines.index(self.engine), self.enemy_ais.index(self.enemy_ai)))
+            file.write(b''.join(self.action.pack(frame, action) for frame, action in self.actions))
+            file.write(self.action.pack(self.frames, self.end) + self.final_hash)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as file:
+            data = file.read()
+        magic, version, seed, width, height, engine, enemy_ai = cls.header.unpack_from(data)
+        if magic != cls.magic or version != cls.version:
+            raise ValueError(f'{path} is not a version {cls.version} replay')
+        recording = cls(seed, width, height, cls.engines[engine], cls.enemy_ais[enemy_ai])
+        for offset in range(cls.header.size, len(data), cls.action.size):
+            frame, action = cls.action.unpack_from(data, offset)
+            if action == cls.end:
+                recording.frames = frame
+                recording.final_hash = data[offset + cls.action.size:]
+                break
+            recording.actions.append((frame, action))
+        return recording
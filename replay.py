@@ -0,0 +1,71 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')  # окно не нужно
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import pygame
+import config
+import main
+from recording import Recording
+
+# █▀▄ █▀▀ █▀▄ █   ▄▀▄ █ █
+# █▀▄ █▀▀ █▀  █   █▀█  █
+# ▀ ▀ ▀▀▀ ▀   ▀▀▀ ▀ ▀  ▀
+# воспроизведение записанной партии (config.record_file) без окна и без ограничения fps
+# в конце сверяет хеш состояния поля с записанным
+# пример: python replay.py game.rec --render-every 10
+
+
+# проигрывает запись, каждый render_every кадр рисуется в screen (0 - не рисовать)
+# возвращает хеш итогового состояния поля и число отрисованных кадров
+def replay(recording, render_every=0, screen=None):
+    random.seed(recording.seed)
+    view = min(recording.width, config.view_width), min(recording.height, config.view_height)
+    board = main.BOARD_ENGINES[recording.engine](recording.width, recording.height, cell_size=main.cs,
+                                                 left_shift=65, top_shift=75, view_size=view)
+    board.enemy_ai = recording.enemy_ai
+    board.new_game()
+    game = main.Game(board)
+    actions = iter(recording.actions)
+    action = next(actions, None)
+    rendered = 0
+    for frame in range(recording.frames):
+        while action is not None and action[0] == frame:
+            game.handle(action[1])
+            action = next(actions, None)
+        if render_every and frame % render_every == 0:
+            board.render(screen)
+            board.render_heating(screen)
+            board.render_player_score(screen)
+            pygame.display.flip()
+            rendered += 1
+        game.update()
+    return board.state_hash(), rendered
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Headless replay of a recorded Superhot 2d game')
+    parser.add_argument('recording', help='file written by the game with config.record_file')
+    parser.add_argument('--render-every', type=int, default=0, help='render every Nth frame, 0 = never')
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args(sys.argv[1:])
+    recording = Recording.load(args.recording)
+    screen = main.init_display() if args.render_every else None
+    start = time.perf_counter()
+    final_hash, rendered = replay(recording, args.render_every, screen)
+    elapsed = time.perf_counter() - start
+    match = final_hash == recording.final_hash
+    print(json.dumps({'frames': recording.frames, 'actions': len(recording.actions), 'rendered': rendered,
+                      'elapsed_s': elapsed, 'frames_per_second': recording.frames / elapsed if elapsed else 0,
+                      'hash': final_hash.hex(), 'expected_hash': recording.final_hash.hex(), 'match': match},
+                     indent=2))
+    sys.exit(0 if match else 1)
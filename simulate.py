@@ -0,0 +1,231 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import importlib
+from concurrent.futures import ProcessPoolExecutor
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import core
+import main
+
+# ▄▀▀ █ █▄ ▄█ █ █ █   ▄▀▄ ▀█▀ █ ▄▀▄ █▄ █
+#  ▀▄ █ █ ▀ █ █ █ █   █▀█  █  █ █ █ █ ▀█
+# ▀▀  ▀ ▀   ▀  ▀  ▀▀▀ ▀ ▀  ▀  ▀  ▀  ▀  ▀
+# пакетный прогон игр без окна: много партий на нескольких процессах
+# с заданной стратегией игрока, итоги сохраняются в json
+# пример: python simulate.py --games 10000 --workers 8 --policy hunter
+#         python simulate.py --parity --games 200 --ai flow
+
+VECTORS = ([0, -1], [0, 1], [-1, 0], [1, 0])
+
+
+# стратегии игрока: получают поле и генератор случайных чисел,
+# возвращают действие ('move' или 'shoot') и направление
+def random_policy(board, rng):
+    if board.heating == core.MAX_HEATING - 1:
+        return 'move', rng.choice(VECTORS)  # не даём лазеру взорваться
+    return rng.choice(('move', 'shoot')), rng.choice(VECTORS)
+
+
+# стреляет во врага на одной линии с игроком, иначе идёт к ближайшему врагу,
+# стараясь не вставать на линию огня
+def hunter_policy(board, rng):
+    x, y = board.player_obj.get_pos()
+    if board.heating < core.MAX_HEATING - 1:
+        for enemy in board.enemies:
+            if (enemy.x == x) != (enemy.y == y):  # на одной линии, но не в той же клетке
+                return 'shoot', [(enemy.x > x) - (enemy.x < x), (enemy.y > y) - (enemy.y < y)]
+    if not board.enemies:
+        return 'move', rng.choice(VECTORS)
+    target = min(board.enemies, key=lambda enemy: abs(enemy.x - x) + abs(enemy.y - y))
+    moves = [vector for vector in VECTORS
+             if 0 <= x + vector[0] < board.width and 0 <= y + vector[1] < board.height
+             and not board.is_blocked(x + vector[0], y + vector[1])]
+    if not moves:
+        return 'shoot', rng.choice(VECTORS)  # зажаты со всех сторон - пробиваемся
+
+    def rank(vector):  # сначала клетки не на линии огня врагов, потом ближе к цели
+        new_x, new_y = x + vector[0], y + vector[1]
+        danger = sum(enemy.x == new_x or enemy.y == new_y for enemy in board.enemies)
+        return danger, abs(target.x - new_x) + abs(target.y - new_y), rng.random()
+
+    return 'move', min(moves, key=rank)
+
+
+POLICIES = {'random': random_policy, 'hunter': hunter_policy}
+VECTOR_TURNS = {vector: action for action, vector in main.TURN_VECTORS.items()}
+
+
+# ход игрока через main.Game, как в окне: поворот, действие и кадры до конца заморозки
+# возвращает False, если ход невозможен (стена или край поля)
+def play_turn(game, action, vector):
+    game.handle(VECTOR_TURNS[tuple(vector)])
+    game.handle(main.MOVE if action == 'move' else main.SHOOT)
+    if not game.freeze:
+        return False
+    while game.freeze:
+        game.update()
+    return True
+
+
+# стратегия по имени из POLICIES или в виде 'модуль:функция'
+def get_policy(name):
+    if name in POLICIES:
+        return POLICIES[name]
+    module, function = name.split(':')
+    return getattr(importlib.import_module(module), function)
+
+
+# одна партия, возвращает её итоги
+def play_game(seed, policy, engine='list', max_turns=500, size=(main.n1, main.n2), ai='greedy'):
+    random.seed(seed)  # поле пользуется общим модулем random
+    rng = random.Random(seed)
+    board = main.BOARD_ENGINES[engine](*size)
+    board.enemy_ai = ai
+    board.new_game()
+    game = main.Game(board)
+    enemies = len(board.enemies)
+    turns = 0
+    blocked = 0  # попыток пойти в стену или за край
+    turn_time = 0
+    max_turn_time = 0
+    while board.game_run and turns + blocked < max_turns:
+        action, vector = policy(board, rng)
+        start = time.perf_counter_ns()
+        if not play_turn(game, action, vector):
+            blocked += 1
+            continue
+        spent = time.perf_counter_ns() - start
+        turns += 1
+        turn_time += spent
+        max_turn_time = max(max_turn_time, spent)
+    if not board.enemies:
+        result = 'win'
+    elif board.heating == core.MAX_HEATING:
+        result = 'heat'
+    elif board.game_run:
+        result = 'timeout'
+    else:
+        result = 'killed'
+    return {'seed': seed, 'result': result, 'turns': turns, 'blocked': blocked,
+            'kills': enemies - len(board.enemies), 'score': board.player_obj.score,
+            'explosions': board.explosion_count, 'max_chain': board.max_explosion_chain,
+            'turn_time_ns': turn_time, 'max_turn_time_ns': max_turn_time}
+
+
+# хеши состояния поля (Board.state_hash) после каждого хода партии
+def turn_hashes(seed, policy, engine='list', max_turns=500, size=(main.n1, main.n2), ai='greedy'):
+    random.seed(seed)
+    rng = random.Random(seed)
+    board = main.BOARD_ENGINES[engine](*size)
+    board.enemy_ai = ai
+    board.new_game()
+    game = main.Game(board)
+    hashes = [board.state_hash()]
+    attempts = 0
+    while board.game_run and attempts < max_turns:
+        attempts += 1
+        if not play_turn(game, *policy(board, rng)):
+            continue
+        hashes.append(board.state_hash())
+    return hashes
+
+
+# проверка, что оба движка поля играют одинаково: те же партии, те же хеши после каждого хода
+# возвращает партии, где движки разошлись, с номером первого отличающегося хода
+def check_parity(games, seed=0, policy='hunter', max_turns=500, size=(main.n1, main.n2), ai='greedy'):
+    policy = get_policy(policy)
+    mismatches = []
+    for game_seed in range(seed, seed + games):
+        expected = turn_hashes(game_seed, policy, 'list', max_turns, size, ai)
+        actual = turn_hashes(game_seed, policy, 'array', max_turns, size, ai)
+        if expected != actual:
+            turn = next((i for i, (a, b) in enumerate(zip(expected, actual)) if a != b),
+                        min(len(expected), len(actual)))
+            mismatches.append({'seed': game_seed, 'turn': turn})
+    return mismatches
+
+
+# пачка партий для одного процесса
+def play_games(seeds, policy_name, engine, max_turns, size, ai):
+    policy = get_policy(policy_name)
+    return [play_game(seed, policy, engine, max_turns, size, ai) for seed in seeds]
+
+
+def summarize(games, elapsed):
+    turns = sum(game['turns'] for game in games)
+    turn_time = sum(game['turn_time_ns'] for game in games)
+    results = {}
+    for game in games:
+        results[game['result']] = results.get(game['result'], 0) + 1
+    return {
+        'games': len(games),
+        'results': results,
+        'win_rate': results.get('win', 0) / len(games),
+        'heat_deaths': results.get('heat', 0),
+        'turns_total': turns,
+        'turns_per_game': turns / len(games),
+        'kills_per_game': sum(game['kills'] for game in games) / len(games),
+        'score_per_game': sum(game['score'] for game in games) / len(games),
+        'explosions_per_game': sum(game['explosions'] for game in games) / len(games),
+        'max_chain': max(game['max_chain'] for game in games),
+        'turn_time_mean_us': turn_time / max(turns, 1) / 1000,
+        'turn_time_max_us': max(game['max_turn_time_ns'] for game in games) / 1000,
+        'elapsed_s': elapsed,
+        'turns_per_second': turns / elapsed if elapsed else 0,
+    }
+
+
+def run_batch(games, workers=None, seed=0, policy='hunter', engine='list', max_turns=500,
+              size=(main.n1, main.n2), ai='greedy', chunk_size=100):
+    workers = workers or os.cpu_count()
+    # у каждой партии своё зерно, поэтому итог не зависит от числа процессов
+    seeds = list(range(seed, seed + games))
+    chunks = [seeds[i:i + chunk_size] for i in range(0, games, chunk_size)]
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(workers) as executor:
+        futures = [executor.submit(play_games, chunk, policy, engine, max_turns, size, ai) for chunk in chunks]
+        for future in futures:
+            results.extend(future.result())
+    summary = summarize(results, time.perf_counter() - start)
+    summary.update({'policy': policy, 'engine': engine, 'ai': ai, 'seed': seed, 'workers': workers,
+                    'board_size': list(size), 'max_turns': max_turns})
+    return summary, results
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Headless batch simulation of Superhot 2d games')
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=None, help='processes, cpu count by default')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first game')
+    parser.add_argument('--policy', default='hunter', help='random, hunter or module:function')
+    parser.add_argument('--engine', default='list', choices=sorted(main.BOARD_ENGINES))
+    parser.add_argument('--ai', default='greedy', choices=['greedy', 'flow'], help='enemy movement')
+    parser.add_argument('--max-turns', type=int, default=500)
+    parser.add_argument('--size', type=int, nargs=2, default=[main.n1, main.n2], metavar=('WIDTH', 'HEIGHT'))
+    parser.add_argument('--out', default='simulation_summary.json')
+    parser.add_argument('--games-out', default=None, help='also save per-game results (json lines)')
+    parser.add_argument('--parity', action='store_true', help='check that both board engines play the same games')
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args(sys.argv[1:])
+    if args.parity:
+        mismatches = check_parity(args.games, args.seed, args.policy, args.max_turns, tuple(args.size), args.ai)
+        print(json.dumps({'games': args.games, 'ai': args.ai, 'mismatches': mismatches}, indent=2))
+        sys.exit(1 if mismatches else 0)
+    summary, results = run_batch(args.games, args.workers, args.seed, args.policy, args.engine,
+                                 args.max_turns, tuple(args.size), args.ai)
+    with open(args.out, 'w') as file:
+        json.dump(summary, file, indent=2)
+    if args.games_out:
+        with open(args.games_out, 'w') as file:
+            for game in results:
+                file.write(json.dumps(game) + '\n')
+    print(json.dumps(summary, indent=2))
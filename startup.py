@@ -0,0 +1,89 @@
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from statistics import median
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')  # окно не нужно
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import pygame
+import config
+import core
+import main
+
+# ▄▀▀ ▀█▀ ▄▀▄ █▀▄ ▀█▀
+#  ▀▄  █  █▀█ █▀▄  █
+# ▀▀   ▀  ▀ ▀ ▀ ▀  ▀
+# время до первого кадра игры и память процесса со звуком и без,
+# каждый замер в отдельном процессе, чтобы память не смешивалась
+# режимы: off - без звука, stream - музыка потоком (как в игре), decoded - музыка целиком в памяти
+# пример: python startup.py --repeat 5
+
+MODES = ('off', 'stream', 'decoded')
+
+
+def peak_rss_mb():  # пиковая резидентная память процесса
+    try:
+        import resource
+    except ImportError:  # windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2 ** 20 if sys.platform == 'darwin' else rss / 2 ** 10  # на macos в байтах, иначе в килобайтах
+
+
+# запуск игры до первого кадра как в main.main, время в миллисекундах от init_display
+def first_frame(mode):
+    config.audio = mode != 'off'
+    config.debug_mode = 0
+    start = time.perf_counter()
+    screen = main.init_display()
+    screen.blit(core.load_image(config.start_screen, size=screen.get_size()), (0, 0))
+    pygame.display.flip()
+    start_screen_ms = (time.perf_counter() - start) * 1000
+    board = main.BOARD_ENGINES[config.board_engine](main.n1, main.n2, cell_size=main.cs, left_shift=65,
+                                                    top_shift=75, view_size=main.view_size)
+    board.new_game(screen)
+    if mode == 'decoded':  # как раньше: весь трек декодируется в pygame.mixer.Sound
+        music = pygame.mixer.Sound(config.game_music)
+        music.set_volume(config.game_volume)
+        music.play(-1)
+    else:
+        main.Sounds(config.audio, config.game_volume).play_music()
+    board.render(screen)
+    board.render_heating(screen)
+    pygame.display.flip()
+    return {'start_screen_ms': start_screen_ms, 'first_frame_ms': (time.perf_counter() - start) * 1000,
+            'mixer': pygame.mixer.get_init(), 'peak_rss_mb': peak_rss_mb()}
+
+
+def measure(mode, repeat):
+    runs = []
+    for _ in range(repeat):
+        child = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', mode],
+                               capture_output=True, text=True, check=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__)))
+        runs.append(json.loads(child.stdout.splitlines()[-1]))
+    result = {key: median(run[key] for run in runs) for key in ('start_screen_ms', 'first_frame_ms')}
+    if runs[0]['peak_rss_mb'] is not None:
+        result['peak_rss_mb'] = median(run['peak_rss_mb'] for run in runs)
+    result['mixer'] = runs[0]['mixer']
+    return result
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Time to first frame and memory of Superhot 2d with and without audio')
+    parser.add_argument('--modes', nargs='+', default=list(MODES), choices=MODES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--child', default=None, choices=MODES, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parse_args(sys.argv[1:])
+    if args.child:
+        print(json.dumps(first_frame(args.child)))
+    else:
+        print(json.dumps({mode: measure(mode, args.repeat) for mode in args.modes}, indent=2))